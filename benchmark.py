@@ -0,0 +1,161 @@
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+import contextlib
+import numpy as np
+import networkx as nx
+from pathlib import Path
+from social_net import SocialNetwork
+from graph_store import openStore
+
+# The benchmark harness runs every SocialNetwork method over graphs of growing size and records
+# its wall time and peak traced memory, so that scaling curves can be compared between versions.
+# Every graph is generated from a fixed seed or cut from the bundled data/ dumps, so no run
+# touches the network and two runs on the same machine measure the same work
+RESULTS_VERSION = 1
+DEFAULT_NODES = [1000, 2000, 5000, 10000, 20000]
+DATA_DIR = Path(__file__).parent / 'data'
+
+# Graph sources, each building a SocialNetwork with the given number of nodes
+def powerLawNetwork(numberOfNodes: int, seed: int) -> SocialNetwork:
+  return SocialNetwork(nx.barabasi_albert_graph(numberOfNodes, 5, seed=seed))
+
+def randomNetwork(numberOfNodes: int, seed: int) -> SocialNetwork:
+  return SocialNetwork(nx.gnm_random_graph(numberOfNodes, 5 * numberOfNodes, seed=seed))
+
+# githubNetwork takes the first nodes of the bundled github dump, like the old stress tests
+def githubNetwork(numberOfNodes: int, seed: int) -> SocialNetwork:
+  csrGraph = openStore(DATA_DIR / 'github_users.p')
+  return SocialNetwork(csrGraph=csrGraph.subgraph(np.arange(min(numberOfNodes, csrGraph.numberOfNodes()))))
+
+# githubTopDegreeNetwork takes the nodes with the most friends, like createSocialNet
+def githubTopDegreeNetwork(numberOfNodes: int, seed: int) -> SocialNetwork:
+  csrGraph = openStore(DATA_DIR / 'github_users.p')
+  return SocialNetwork(csrGraph=csrGraph.subgraph(np.argsort(-csrGraph.degrees(), kind='stable')[:numberOfNodes]))
+
+GRAPHS = {
+  'powerlaw': powerLawNetwork,
+  'random': randomNetwork,
+  'github': githubNetwork,
+  'github-top-degree': githubTopDegreeNetwork,
+}
+
+# Methods under test. Each one gets a fresh SocialNetwork, so no call is answered from a cache
+def shortestPathBetweenEnds(sn: SocialNetwork):
+  nodes = sn.csrGraph.nodes
+  return sn.getShortestPath(nodes[0], nodes[-1])
+
+def fullTraversal(sn: SocialNetwork):
+  return sum(1 for _ in sn.traverseBFS(sn.csrGraph.nodes[0]))
+
+METHODS = {
+  'recommendedFriends': lambda sn: sn.recommendedFriends(),
+  'findImportantPeople': lambda sn: sn.findImportantPeople(),
+  'findLargestCommunities': lambda sn: sn.findLargestCommunities(),
+  'connectCommunities': lambda sn: sn.connectCommunities(),
+  'detectCommunities': lambda sn: sn.detectCommunities(),
+  'getShortestPath': shortestPathBetweenEnds,
+  'traverseBFS': fullTraversal,
+}
+
+# measure times one method call on fresh networks, and traces one more call for its peak memory.
+# Construction is not part of the measurement. The method output is discarded
+def measure(buildNetwork, method, repeat: int) -> tuple[list, int]:
+  seconds = []
+  for _ in range(repeat):
+    sn = buildNetwork()
+    with contextlib.redirect_stdout(io.StringIO()):
+      start = time.perf_counter()
+      method(sn)
+      seconds.append(time.perf_counter() - start)
+
+  # Tracing slows every allocation down, so the peak is taken from a separate, untimed run
+  sn = buildNetwork()
+  tracemalloc.start()
+  try:
+    with contextlib.redirect_stdout(io.StringIO()):
+      method(sn)
+    _, peakBytes = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  return seconds, peakBytes
+
+# runBenchmark sweeps every graph size for every method, and returns one record per run
+def runBenchmark(graph: str = 'powerlaw', nodes: list = None, methods: list = None, repeat: int = 3, seed: int = 0) -> dict:
+  buildNetwork = GRAPHS[graph]
+  records = []
+  for numberOfNodes in nodes or DEFAULT_NODES:
+    sn = buildNetwork(numberOfNodes, seed)
+    record = {'graph': graph, 'nodes': sn.csrGraph.numberOfNodes(), 'edges': sn.csrGraph.numberOfEdges()}
+    for name in methods or list(METHODS):
+      seconds, peakBytes = measure(lambda: buildNetwork(numberOfNodes, seed), METHODS[name], repeat)
+      records.append(dict(record, method=name, seconds=min(seconds), medianSeconds=statistics.median(seconds), peakBytes=peakBytes))
+      print(f"{graph:>18} {record['nodes']:>7} nodes {name:>24} {min(seconds):10.4f}s {peakBytes / 2 ** 20:10.2f} MiB")
+  return {
+    'version': RESULTS_VERSION,
+    'python': platform.python_version(),
+    'numpy': np.__version__,
+    'networkx': nx.__version__,
+    'machine': platform.machine(),
+    'seed': seed,
+    'repeat': repeat,
+    'results': records,
+  }
+
+def saveResults(results: dict, resultsPath: Path) -> None:
+  with open(resultsPath, 'w') as f:
+    json.dump(results, f, indent=2)
+
+def loadResults(resultsPath: Path) -> dict:
+  with open(resultsPath) as f:
+    results = json.load(f)
+  if results['version'] != RESULTS_VERSION:
+    raise ValueError(f"Unsupported benchmark results version {results['version']} in {resultsPath}")
+  return results
+
+# compareResults flags every run that is slower (or uses more memory) than the same run in the
+# baseline by more than the tolerance. Runs faster than minSeconds are too noisy to compare on time
+def compareResults(results: dict, baseline: dict, tolerance: float = 0.25, minSeconds: float = 0.01) -> list[dict]:
+  baselineRecords = {(record['graph'], record['nodes'], record['method']): record for record in baseline['results']}
+  regressions = []
+  for record in results['results']:
+    baselineRecord = baselineRecords.get((record['graph'], record['nodes'], record['method']))
+    if baselineRecord is None:
+      continue
+    for metric, floor in (('seconds', minSeconds), ('peakBytes', 0)):
+      if record[metric] > max(baselineRecord[metric], floor) * (1 + tolerance):
+        regressions.append({'graph': record['graph'], 'nodes': record['nodes'], 'method': record['method'], 'metric': metric,
+                            'baseline': baselineRecord[metric], 'current': record[metric]})
+  return regressions
+
+def main(arguments: list = None) -> int:
+  parser = argparse.ArgumentParser(description="Time every SocialNetwork method over growing graphs")
+  parser.add_argument('--graph', choices=sorted(GRAPHS), default='powerlaw')
+  parser.add_argument('--nodes', type=int, nargs='+', default=DEFAULT_NODES)
+  parser.add_argument('--methods', choices=sorted(METHODS), nargs='+', default=list(METHODS))
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--output', type=Path, help="write the results as JSON")
+  parser.add_argument('--baseline', type=Path, help="compare against results saved by an earlier run")
+  parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a run is a regression")
+  args = parser.parse_args(arguments)
+
+  results = runBenchmark(args.graph, args.nodes, args.methods, args.repeat, args.seed)
+  if args.output:
+    saveResults(results, args.output)
+    print(f'Results Saved: {args.output}')
+  if args.baseline:
+    regressions = compareResults(results, loadResults(args.baseline), args.tolerance)
+    for regression in regressions:
+      print("Regression: {graph} {nodes} nodes {method} {metric} {baseline} -> {current}".format(**regression))
+    if regressions:
+      return 1
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
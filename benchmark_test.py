@@ -0,0 +1,38 @@
+import unittest
+import tempfile
+from pathlib import Path
+from benchmark import runBenchmark, saveResults, loadResults, compareResults, main
+
+class TestBenchmark(unittest.TestCase):
+  def test_SweepRecordsTimeAndMemoryPerMethod(self):
+    results = runBenchmark('powerlaw', [100, 200], ['recommendedFriends', 'findImportantPeople'], repeat=2)
+    records = results['results']
+    self.assertEqual([(100, 'recommendedFriends'), (100, 'findImportantPeople'), (200, 'recommendedFriends'), (200, 'findImportantPeople')],
+                     [(record['nodes'], record['method']) for record in records])
+    for record in records:
+      self.assertGreater(record['seconds'], 0)
+      self.assertGreaterEqual(record['medianSeconds'], record['seconds'])
+      self.assertGreater(record['peakBytes'], 0)
+
+  def test_GeneratedGraphsAreDeterministic(self):
+    first = runBenchmark('random', [150], ['getShortestPath'], repeat=1, seed=7)['results'][0]
+    second = runBenchmark('random', [150], ['getShortestPath'], repeat=1, seed=7)['results'][0]
+    self.assertEqual((first['nodes'], first['edges']), (second['nodes'], second['edges']))
+
+  def test_CompareFlagsRegressionsAgainstBaseline(self):
+    baseline = runBenchmark('powerlaw', [100], ['traverseBFS'], repeat=1)
+    with tempfile.TemporaryDirectory() as tempDir:
+      baselinePath = Path(tempDir) / 'baseline.json'
+      saveResults(baseline, baselinePath)
+      self.assertEqual(baseline, loadResults(baselinePath))
+
+      self.assertEqual([], compareResults(baseline, baseline))
+      slower = {**baseline, 'results': [dict(record, seconds=record['seconds'] + 1.0) for record in baseline['results']]}
+      regressions = compareResults(slower, baseline)
+      self.assertEqual(['seconds'], [regression['metric'] for regression in regressions])
+
+      # A run compared with itself (within the tolerance) exits cleanly
+      self.assertEqual(0, main(['--nodes', '100', '--methods', 'traverseBFS', '--repeat', '1', '--baseline', str(baselinePath), '--tolerance', '1000']))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,162 @@
+import math
+import numpy as np
+import scipy as sp
+from concurrent.futures import ProcessPoolExecutor
+from csr_graph import CSRGraph
+from shared_arrays import SharedArrays, attachWorker, workerArrays
+
+# gatherEdges returns every (source, target) edge leaving the given nodes
+def gatherEdges(csrGraph: CSRGraph, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  starts = csrGraph.offsets[nodes]
+  degrees = csrGraph.offsets[nodes + 1] - starts
+  total = int(degrees.sum())
+  groupStarts = np.repeat(np.cumsum(degrees) - degrees, degrees)
+  positions = np.repeat(starts, degrees) + np.arange(total, dtype=np.int64) - groupStarts
+  return np.repeat(nodes, degrees), csrGraph.indices[positions].astype(np.int64)
+
+# singleSourceDependencies runs one Brandes accumulation from source with a level synchronous BFS,
+# where every level is a handful of vectorized array operations instead of a loop per vertex.
+# Returns the dependency of source on every node (0 for source itself)
+# Time complexity: O(V + E)
+# Space complexity: O(V + E) for the shortest path DAG
+def singleSourceDependencies(csrGraph: CSRGraph, source: int) -> np.ndarray:
+  numberOfNodes = csrGraph.numberOfNodes()
+  distances = np.full(numberOfNodes, -1, dtype=np.int64)
+  pathCounts = np.zeros(numberOfNodes, dtype=np.float64)
+  distances[source], pathCounts[source] = 0, 1.0
+  frontier = np.array([source], dtype=np.int64)
+  levels, depth = [], 0
+  while len(frontier):
+    sources, targets = gatherEdges(csrGraph, frontier)
+    distances[targets[distances[targets] < 0]] = depth + 1
+    # Edges of the shortest path DAG end on the next level
+    onNextLevel = distances[targets] == depth + 1
+    sources, targets = sources[onNextLevel], targets[onNextLevel]
+    pathCounts += np.bincount(targets, weights=pathCounts[sources], minlength=numberOfNodes)
+    levels.append((sources, targets))
+    frontier = np.unique(targets)
+    depth += 1
+
+  dependencies = np.zeros(numberOfNodes, dtype=np.float64)
+  for sources, targets in reversed(levels):
+    dependencies += np.bincount(sources, weights=pathCounts[sources] / pathCounts[targets] * (1.0 + dependencies[targets]), minlength=numberOfNodes)
+  dependencies[source] = 0.0
+  return dependencies
+
+def sumDependencies(csrGraph: CSRGraph, pivots: np.ndarray) -> np.ndarray:
+  total = np.zeros(csrGraph.numberOfNodes(), dtype=np.float64)
+  for pivot in pivots.tolist():
+    total += singleSourceDependencies(csrGraph, pivot)
+  return total
+
+def sumDependenciesShard(pivots: np.ndarray, directed: bool) -> np.ndarray:
+  return sumDependencies(CSRGraph.fromSharedArrays(workerArrays, directed), pivots)
+
+# pivotsForErrorBound is the number of sampled sources that keeps every normalized score within
+# epsilon of the exact one with probability 1 - delta (Hoeffding bound plus a union bound over the nodes)
+def pivotsForErrorBound(numberOfNodes: int, epsilon: float, delta: float) -> int:
+  if numberOfNodes == 0:
+    return 0
+  return min(numberOfNodes, math.ceil(math.log(2 * numberOfNodes / delta) / (2 * epsilon ** 2)))
+
+# approximateBetweenness estimates the normalized betweenness centrality of every node from
+# the Brandes dependencies of k sampled pivot sources, scaled by V / k. With k = V it is exact and
+# matches networkx betweenness_centrality(normalized=True). The pivots are either given or derived
+# from an (epsilon, delta) error bound, sampled with a seeded generator, and split across a process
+# pool over shared memory adjacency when workers > 1
+# Time complexity: O(k * (V + E))
+def approximateBetweenness(csrGraph: CSRGraph, pivots: int = None, epsilon: float = 0.1, delta: float = 0.1, seed: int = 0, workers: int = 1) -> np.ndarray:
+  numberOfNodes = csrGraph.numberOfNodes()
+  if numberOfNodes <= 2:
+    return np.zeros(numberOfNodes, dtype=np.float64)
+
+  numberOfPivots = pivotsForErrorBound(numberOfNodes, epsilon, delta) if pivots is None else min(pivots, numberOfNodes)
+  if numberOfPivots == numberOfNodes:
+    sources = np.arange(numberOfNodes, dtype=np.int64)
+  else:
+    sources = np.sort(np.random.default_rng(seed).choice(numberOfNodes, numberOfPivots, replace=False))
+
+  if workers > 1 and numberOfPivots > 1:
+    shards = [shard for shard in np.array_split(sources, workers) if len(shard)]
+    with SharedArrays(csrGraph.sharedArrays()) as sharedArrays:
+      with ProcessPoolExecutor(max_workers=workers, initializer=attachWorker, initargs=(sharedArrays.descriptors,)) as executor:
+        partialSums = list(executor.map(sumDependenciesShard, shards, [csrGraph.directed] * len(shards)))
+    dependencies = np.sum(partialSums, axis=0)
+  else:
+    dependencies = sumDependencies(csrGraph, sources)
+
+  # The same rescaling as networkx: normalize by the number of pairs, then extrapolate the sample
+  return dependencies * (numberOfNodes / numberOfPivots) / ((numberOfNodes - 1) * (numberOfNodes - 2))
+
+# PowerIteration holds the scores of a power iteration, how many iterations it took,
+# and whether it met the tolerance before the iteration cap
+class PowerIteration:
+  def __init__(self, scores: np.ndarray, iterations: int, converged: bool) -> None:
+    self.scores = scores
+    self.iterations = iterations
+    self.converged = converged
+
+# adjacencyMatrix wraps the CSR arrays in a scipy sparse matrix without copying the adjacency,
+# rows are the sources (successors for directed graphs)
+def adjacencyMatrix(csrGraph: CSRGraph) -> sp.sparse.csr_array:
+  numberOfNodes = csrGraph.numberOfNodes()
+  return sp.sparse.csr_array((np.ones(len(csrGraph.indices), dtype=np.float64), csrGraph.indices, csrGraph.offsets), shape=(numberOfNodes, numberOfNodes))
+
+# startVector normalizes a warm start (e.g. the scores before the last edge changes),
+# or returns the uniform vector without one
+def startVector(numberOfNodes: int, start: np.ndarray) -> np.ndarray:
+  if start is None or len(start) != numberOfNodes or start.sum() <= 0:
+    return np.full(numberOfNodes, 1.0 / numberOfNodes)
+  return start / start.sum()
+
+# pageRank ranks the nodes by the stationary distribution of a random surfer who follows an
+# out-edge with probability alpha and jumps to a uniform random node otherwise (and always from
+# nodes without out-edges), like networkx pagerank. Each iteration is one sparse matrix product.
+# It stops when the scores move by less than numberOfNodes * tolerance (L1) or after maxIterations
+# Time complexity: O(iterations * (V + E))
+def pageRank(csrGraph: CSRGraph, alpha: float = 0.85, tolerance: float = 1e-6, maxIterations: int = 100, start: np.ndarray = None) -> PowerIteration:
+  numberOfNodes = csrGraph.numberOfNodes()
+  if numberOfNodes == 0:
+    return PowerIteration(np.zeros(0), 0, True)
+  outDegrees = csrGraph.degrees().astype(np.float64)
+  isDangling = outDegrees == 0
+  inverseDegrees = np.divide(1.0, outDegrees, out=np.zeros(numberOfNodes), where=~isDangling)
+  # Column stochastic transpose, so that one step is a matrix vector product
+  transition = (adjacencyMatrix(csrGraph).T @ sp.sparse.diags_array(inverseDegrees)).tocsr()
+
+  scores = startVector(numberOfNodes, start)
+  for iteration in range(1, maxIterations + 1):
+    previous = scores
+    scores = alpha * (transition @ previous + previous[isDangling].sum() / numberOfNodes) + (1 - alpha) / numberOfNodes
+    if np.abs(scores - previous).sum() < numberOfNodes * tolerance:
+      return PowerIteration(scores, iteration, True)
+  return PowerIteration(scores, maxIterations, False)
+
+# hits computes hub and authority scores with the power method: a good authority is followed by
+# good hubs and a good hub follows good authorities. Scores are normalized to sum to 1 like networkx
+# hits. The warm start is a previous hub vector. Returns the hub iteration and the authority scores
+# Time complexity: O(iterations * (V + E))
+def hits(csrGraph: CSRGraph, tolerance: float = 1e-8, maxIterations: int = 100, start: np.ndarray = None) -> tuple[PowerIteration, np.ndarray]:
+  numberOfNodes = csrGraph.numberOfNodes()
+  if numberOfNodes == 0:
+    return PowerIteration(np.zeros(0), 0, True), np.zeros(0)
+  adjacency = adjacencyMatrix(csrGraph)
+  transposed = adjacency.T.tocsr()
+  hubs = startVector(numberOfNodes, start)
+  authorities = np.zeros(numberOfNodes)
+  iterations, converged = maxIterations, False
+  for iteration in range(1, maxIterations + 1):
+    previous = hubs
+    authorities = transposed @ previous
+    hubs = adjacency @ authorities
+    if hubs.max(initial=0) == 0:
+      # No edges: every node is as good as any other
+      hubs, authorities = np.ones(numberOfNodes), np.ones(numberOfNodes)
+      iterations, converged = iteration, True
+      break
+    hubs /= hubs.max()
+    authorities /= authorities.max()
+    if np.abs(hubs - previous / previous.max()).sum() < numberOfNodes * tolerance:
+      iterations, converged = iteration, True
+      break
+  return PowerIteration(hubs / hubs.sum(), iterations, converged), authorities / authorities.sum()
@@ -0,0 +1,137 @@
+import time
+import heapq
+import networkx as nx
+from csr_graph import CSRGraph
+
+# Number of search steps between two checks of the time budget
+STEPS_PER_DEADLINE_CHECK = 256
+
+# TopCliques holds the k largest maximal cliques found, largest first,
+# whether the search finished (False when the time budget ran out first),
+# and how many search steps and maximal cliques the search went through
+class TopCliques:
+  def __init__(self, cliques: list, complete: bool, steps: int = 0, maximalCliques: int = 0) -> None:
+    self.cliques = cliques
+    self.complete = complete
+    self.steps = steps
+    self.maximalCliques = maximalCliques
+
+class TimeBudgetExceeded(Exception):
+  pass
+
+# degeneracyOrder repeatedly removes a node of minimum remaining degree (bucket queue),
+# which yields an order where every node has at most "degeneracy" later neighbours,
+# together with the core number of every node
+# Time complexity: O(V + E)
+def degeneracyOrder(adjacency: list) -> tuple[list, list]:
+  numberOfNodes = len(adjacency)
+  degrees = [len(neighbors) for neighbors in adjacency]
+  buckets = [dict() for _ in range(max(degrees, default=0) + 1)]
+  for node, degree in enumerate(degrees):
+    buckets[degree][node] = None
+  removed = [False] * numberOfNodes
+  order, coreNumbers = [], [0] * numberOfNodes
+  core, lowest = 0, 0
+  while len(order) < numberOfNodes:
+    while not buckets[lowest]:
+      lowest += 1
+    node = next(iter(buckets[lowest]))
+    del buckets[lowest][node]
+    core = max(core, lowest)
+    coreNumbers[node] = core
+    removed[node] = True
+    order.append(node)
+    for neighbor in adjacency[node]:
+      if not removed[neighbor]:
+        degree = degrees[neighbor]
+        del buckets[degree][neighbor]
+        buckets[degree - 1][neighbor] = None
+        degrees[neighbor] = degree - 1
+        lowest = min(lowest, degree - 1)
+  return order, coreNumbers
+
+# colorBound greedily colours the candidates; a clique needs one colour per member,
+# so the number of colours bounds the size of any clique among them
+# Time complexity: O(P^2)
+def colorBound(candidates: set, adjacency: list) -> int:
+  colorClasses = []
+  for node in candidates:
+    neighbors = adjacency[node]
+    for colorClass in colorClasses:
+      if neighbors.isdisjoint(colorClass):
+        colorClass.append(node)
+        break
+    else:
+      colorClasses.append([node])
+  return len(colorClasses)
+
+# findTopKCliques returns the k largest maximal cliques without enumerating and storing the rest.
+# It runs Bron-Kerbosch with pivoting from every node in reverse degeneracy order, so the dense
+# cores are searched first, and prunes every branch (and every start node, by core number)
+# that can not beat the current k-th largest clique. Only the k best cliques are kept, in a min heap.
+# With a time budget (seconds) the search stops when it runs out and returns the best cliques so far.
+# Ties between cliques of the same size are kept in the order they were found
+# Time complexity: exponential in the worst case, O(d * V * 3^(d/3)) for degeneracy d before pruning
+# Space complexity: O(V + E + k * clique size)
+def findTopKCliques(csrGraph: CSRGraph, k: int = 1, timeBudget: float = None) -> TopCliques:
+  if csrGraph.directed:
+    raise nx.NetworkXNotImplemented("not implemented for directed type")
+  if k < 1:
+    raise ValueError("k must be at least 1")
+
+  numberOfNodes = csrGraph.numberOfNodes()
+  # Self loops are not part of any clique
+  adjacency = [set(csrGraph.neighbors(node)) - {node} for node in range(numberOfNodes)]
+  order, coreNumbers = degeneracyOrder(adjacency)
+  position = [0] * numberOfNodes
+  for index, node in enumerate(order):
+    position[node] = index
+
+  best = []
+  deadline = time.perf_counter() + timeBudget if timeBudget is not None else None
+  steps = maximalCliques = 0
+
+  def threshold() -> int:
+    return best[0][0] if len(best) == k else 0
+
+  def expand(clique: list, candidates: set, excluded: set) -> None:
+    nonlocal steps, maximalCliques
+    steps += 1
+    if deadline is not None and steps % STEPS_PER_DEADLINE_CHECK == 0 and time.perf_counter() > deadline:
+      raise TimeBudgetExceeded()
+
+    if not candidates:
+      # Only a clique that can not be extended by an excluded node is maximal
+      maximalCliques += not excluded
+      if not excluded and len(clique) > threshold():
+        entry = (len(clique), -steps, sorted(clique))
+        if len(best) < k:
+          heapq.heappush(best, entry)
+        else:
+          heapq.heapreplace(best, entry)
+      return
+
+    if len(clique) + len(candidates) <= threshold() or len(clique) + colorBound(candidates, adjacency) <= threshold():
+      return
+
+    pivot = max(candidates | excluded, key=lambda node: len(candidates & adjacency[node]))
+    for node in list(candidates - adjacency[pivot]):
+      neighbors = adjacency[node]
+      expand(clique + [node], candidates & neighbors, excluded & neighbors)
+      candidates.remove(node)
+      excluded.add(node)
+      if len(clique) + len(candidates) <= threshold():
+        return
+
+  complete = True
+  try:
+    for node in reversed(order):
+      # Core numbers never increase along the reversed order, so no later start node can do better
+      if coreNumbers[node] + 1 <= threshold():
+        break
+      later = {neighbor for neighbor in adjacency[node] if position[neighbor] > position[node]}
+      expand([node], later, adjacency[node] - later)
+  except TimeBudgetExceeded:
+    complete = False
+
+  return TopCliques([clique for _, _, clique in sorted(best, reverse=True)], complete, steps, maximalCliques)
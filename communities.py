@@ -0,0 +1,73 @@
+import numpy as np
+from csr_graph import CSRGraph
+from centrality import gatherEdges
+
+# Nodes updated together per round of label propagation. Updating a random part of the nodes at
+# a time (instead of all of them at once) keeps the labels from oscillating between neighbours,
+# while every batch is still a handful of vectorized array operations
+BATCHES_PER_ROUND = 8
+
+# Communities holds a community id for every contiguous node id, communities numbered
+# from the largest (0) down, ties by their first member, and the size of each community
+class Communities:
+  def __init__(self, membership: np.ndarray, sizes: np.ndarray, iterations: int, converged: bool) -> None:
+    self.membership = membership
+    self.sizes = sizes
+    self.iterations = iterations
+    self.converged = converged
+
+  def numberOfCommunities(self) -> int:
+    return len(self.sizes)
+
+  # members returns the contiguous ids in the community, in their original order
+  def members(self, community: int) -> np.ndarray:
+    return np.flatnonzero(self.membership == community)
+
+# rankCommunities renumbers arbitrary labels as 0.. by decreasing community size
+def rankCommunities(labels: np.ndarray, iterations: int, converged: bool) -> Communities:
+  uniqueLabels, firstMembers, membership, sizes = np.unique(labels, return_index=True, return_inverse=True, return_counts=True)
+  ranking = np.lexsort((firstMembers, -sizes))
+  rank = np.empty(len(ranking), dtype=np.int64)
+  rank[ranking] = np.arange(len(ranking))
+  return Communities(rank[membership], sizes[ranking], iterations, converged)
+
+# propagateBatch moves every node of the batch to the label most of its neighbours carry.
+# A node keeps its label when that label is among the most frequent ones, other ties are broken
+# at random. Returns the number of nodes whose label changed
+def propagateBatch(csrGraph: CSRGraph, batch: np.ndarray, labels: np.ndarray, rng: np.random.Generator) -> int:
+  numberOfNodes = len(labels)
+  nodes, neighbors = gatherEdges(csrGraph, batch)
+  if csrGraph.directed:
+    # Followers and followees both count, communities ignore the direction
+    reverseNodes, reverseNeighbors = gatherEdges(csrGraph.reverse(), batch)
+    nodes, neighbors = np.concatenate((nodes, reverseNodes)), np.concatenate((neighbors, reverseNeighbors))
+  if len(nodes) == 0:
+    return 0
+
+  keys, counts = np.unique(nodes * numberOfNodes + labels[neighbors], return_counts=True)
+  keyNodes, keyLabels = keys // numberOfNodes, keys % numberOfNodes
+  # The bonus for the current label beats any random tie break, but never one more neighbour
+  scores = counts + 0.5 * (keyLabels == labels[keyNodes]) + 0.25 * rng.random(len(keys))
+  order = np.lexsort((-scores, keyNodes))
+  isBest = np.concatenate(([True], keyNodes[order][1:] != keyNodes[order][:-1]))
+  bestNodes, bestLabels = keyNodes[order][isBest], keyLabels[order][isBest]
+  changed = int(np.count_nonzero(labels[bestNodes] != bestLabels))
+  labels[bestNodes] = bestLabels
+  return changed
+
+# labelPropagation detects communities by letting every node repeatedly adopt the label most of its
+# neighbours carry, starting from one label per node, until no label changes. Nodes are visited in
+# a seeded random order, in batches that are updated with vectorized array operations, so the same
+# seed always gives the same communities. Directed graphs are treated as undirected
+# Time complexity: O(iterations * E log E), with few iterations in practice
+# Space complexity: O(V + E / BATCHES_PER_ROUND)
+def labelPropagation(csrGraph: CSRGraph, seed: int = 0, maxIterations: int = 100) -> Communities:
+  numberOfNodes = csrGraph.numberOfNodes()
+  labels = np.arange(numberOfNodes, dtype=np.int64)
+  rng = np.random.default_rng(seed)
+  for iteration in range(1, maxIterations + 1):
+    order = rng.permutation(numberOfNodes)
+    changed = sum(propagateBatch(csrGraph, batch, labels, rng) for batch in np.array_split(order, BATCHES_PER_ROUND) if len(batch))
+    if changed == 0:
+      return rankCommunities(labels, iteration, True)
+  return rankCommunities(labels, maxIterations, False)
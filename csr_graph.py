@@ -0,0 +1,165 @@
+import numpy as np
+import networkx as nx
+
+# CSRGraph is a compact, array backed copy of the adjacency of a networkx graph
+# (compressed sparse row). Nodes are relabelled to contiguous ints 0..V-1 so that
+# the neighbours of node i are indices[offsets[i]:offsets[i + 1]], in the same
+# order networkx would report them. For directed graphs the rows hold successors.
+# Space complexity: O(V + E) machine ints instead of one dict per node and edge
+class CSRGraph:
+  def __init__(self, nodes: list, offsets: np.ndarray, indices: np.ndarray, directed: bool = False, nodeAttributes: dict = None, edgeAttributes: dict = None) -> None:
+    # index -> original node id, and the reverse mapping
+    self.nodes = nodes
+    self._nodeIndex = None
+    self.offsets = offsets
+    self.indices = indices
+    self.directed = directed
+    # Optional side columns: attribute name -> (values, present) arrays indexed by node id
+    self.nodeAttributes = nodeAttributes or {}
+    # and attribute name -> (values, present) arrays aligned with indices
+    self.edgeAttributes = edgeAttributes or {}
+    # Sorted (row * V + column) keys of every edge, built on first adjacency lookup
+    self._edgeKeys = None
+    # Transposed graph (predecessors) of a directed graph, built on first use
+    self._reverse = None
+
+  # fromNetworkx walks the networkx adjacency exactly once, so that the cost of
+  # dict-of-dict lookups and subgraph view filtering is paid per edge only here
+  # Time complexity: O(V + E)
+  @classmethod
+  def fromNetworkx(cls, graph: nx.Graph) -> 'CSRGraph':
+    nodes = list(graph.nodes())
+    nodeIndex = {node: i for i, node in enumerate(nodes)}
+    adjacency = graph.adj
+    offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    flatNeighbors = []
+    for i, node in enumerate(nodes):
+      neighbors = [nodeIndex[neighbor] for neighbor in adjacency[node]]
+      offsets[i + 1] = len(neighbors)
+      flatNeighbors.extend(neighbors)
+    np.cumsum(offsets, out=offsets)
+    indices = np.array(flatNeighbors, dtype=indexDtype(len(nodes)))
+    csrGraph = cls(nodes, offsets, indices, directed=graph.is_directed())
+    csrGraph._nodeIndex = nodeIndex
+    return csrGraph
+
+  # toNetworkx materializes a networkx graph for the algorithms that still need one,
+  # e.g. when the graph was loaded from the binary store
+  def toNetworkx(self) -> nx.Graph:
+    graph = nx.DiGraph() if self.directed else nx.Graph()
+    attributeColumns = [(name, values.tolist(), present.tolist()) for name, (values, present) in self.nodeAttributes.items()]
+    for i, node in enumerate(self.nodes):
+      graph.add_node(node, **{name: values[i] for name, values, present in attributeColumns if present[i]})
+    nodes = self.nodes
+    edgeColumns = [(name, values.tolist(), present.tolist()) for name, (values, present) in self.edgeAttributes.items()]
+    for entry, (source, target) in enumerate(zip(self.rowIds().tolist(), self.indices.tolist())):
+      graph.add_edge(nodes[source], nodes[target], **{name: values[entry] for name, values, present in edgeColumns if present[entry]})
+    return graph
+
+  # subgraph keeps the given contiguous ids (in their original order) and the edges between them,
+  # like networkx subgraph views but without filtering on every traversal
+  # Time complexity: O(V + E)
+  def subgraph(self, keep: np.ndarray) -> 'CSRGraph':
+    keep = np.unique(np.asarray(keep, dtype=np.int64))
+    newIds = np.full(len(self.nodes), -1, dtype=np.int64)
+    newIds[keep] = np.arange(len(keep))
+    rowIds = self.rowIds()
+    kept = (newIds[rowIds] >= 0) & (newIds[self.indices] >= 0)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(newIds[rowIds[kept]], minlength=len(keep))))).astype(np.int64)
+    indices = newIds[self.indices[kept]].astype(indexDtype(len(keep)))
+    nodeAttributes = {name: (values[keep], present[keep]) for name, (values, present) in self.nodeAttributes.items()}
+    edgeAttributes = {name: (values[kept], present[kept]) for name, (values, present) in self.edgeAttributes.items()}
+    return CSRGraph([self.nodes[i] for i in keep.tolist()], offsets, indices, directed=self.directed,
+                    nodeAttributes=nodeAttributes, edgeAttributes=edgeAttributes)
+
+  # fromSharedArrays rebuilds a graph over arrays mapped by attachSharedArrays,
+  # with the contiguous ids standing in for the original node ids
+  @classmethod
+  def fromSharedArrays(cls, arrays: dict, directed: bool = False) -> 'CSRGraph':
+    csrGraph = cls(range(len(arrays['offsets']) - 1), arrays['offsets'], arrays['indices'], directed=directed)
+    csrGraph._edgeKeys = arrays['edgeKeys']
+    return csrGraph
+
+  # sharedArrays are the arrays a worker process needs to rebuild the graph
+  def sharedArrays(self) -> dict:
+    return {'offsets': self.offsets, 'indices': self.indices, 'edgeKeys': self.edgeKeys()}
+
+  @property
+  def nodeIndex(self) -> dict:
+    if self._nodeIndex is None:
+      self._nodeIndex = {node: i for i, node in enumerate(self.nodes)}
+    return self._nodeIndex
+
+  def numberOfNodes(self) -> int:
+    return len(self.nodes)
+
+  def numberOfEdges(self) -> int:
+    numberOfEntries = len(self.indices)
+    if self.directed:
+      return numberOfEntries
+    # Every undirected edge is stored in both rows, except self loops
+    selfLoops = int(np.count_nonzero(self.indices == self.rowIds()))
+    return (numberOfEntries + selfLoops) // 2
+
+  # indexOf maps an original node id to its contiguous id
+  def indexOf(self, node) -> int:
+    try:
+      return self.nodeIndex[node]
+    except KeyError:
+      raise nx.NetworkXError(f"The node {node} is not in the graph.") from None
+
+  def degrees(self) -> np.ndarray:
+    return np.diff(self.offsets)
+
+  def degree(self, i: int) -> int:
+    return int(self.offsets[i + 1] - self.offsets[i])
+
+  def neighborArray(self, i: int) -> np.ndarray:
+    return self.indices[self.offsets[i]:self.offsets[i + 1]]
+
+  def neighbors(self, i: int) -> list[int]:
+    return self.indices[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+  # reverse returns the graph with every edge flipped, so its rows hold the predecessors.
+  # An undirected graph is its own reverse
+  # Time complexity: O(V + E log E) once, then O(1)
+  def reverse(self) -> 'CSRGraph':
+    if not self.directed:
+      return self
+    if self._reverse is None:
+      order = np.argsort(self.indices, kind='stable')
+      offsets = np.concatenate(([0], np.cumsum(np.bincount(self.indices, minlength=len(self.nodes))))).astype(np.int64)
+      reverse = CSRGraph(self.nodes, offsets, self.rowIds()[order], directed=True)
+      reverse._nodeIndex = self._nodeIndex
+      reverse._reverse = self
+      self._reverse = reverse
+    return self._reverse
+
+  # rowIds returns the source node of every stored edge entry
+  def rowIds(self) -> np.ndarray:
+    return np.repeat(np.arange(len(self.nodes), dtype=self.indices.dtype), self.degrees())
+
+  def edgeKeys(self) -> np.ndarray:
+    if self._edgeKeys is None:
+      keys = self.rowIds().astype(np.int64) * len(self.nodes) + self.indices
+      keys.sort()
+      self._edgeKeys = keys
+    return self._edgeKeys
+
+  # hasEdges checks a batch of (source, target) pairs with a binary search
+  # over the sorted edge keys
+  # Time complexity: O(P log E)
+  def hasEdges(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    edgeKeys = self.edgeKeys()
+    if len(edgeKeys) == 0:
+      return np.zeros(len(sources), dtype=bool)
+    keys = np.asarray(sources, dtype=np.int64) * len(self.nodes) + np.asarray(targets, dtype=np.int64)
+    positions = np.searchsorted(edgeKeys, keys)
+    positions[positions == len(edgeKeys)] = 0
+    return edgeKeys[positions] == keys
+
+  def hasEdge(self, source: int, target: int) -> bool:
+    return bool(self.hasEdges(np.array([source]), np.array([target]))[0])
+
+def indexDtype(numberOfNodes: int) -> np.dtype:
+  return np.dtype(np.int32) if numberOfNodes < np.iinfo(np.int32).max else np.dtype(np.int64)
@@ -0,0 +1,31 @@
+import unittest
+import networkx as nx
+from csr_graph import CSRGraph
+
+class TestCSRGraph(unittest.TestCase):
+  def test_NeighborsKeepNetworkxOrder(self):
+    graph = nx.powerlaw_cluster_graph(200, 3, 0.3, seed=7)
+    subGraph = graph.subgraph(list(graph.nodes())[:150])
+    csrGraph = CSRGraph.fromNetworkx(subGraph)
+    self.assertEqual(len(subGraph), csrGraph.numberOfNodes())
+    self.assertEqual(subGraph.number_of_edges(), csrGraph.numberOfEdges())
+    for node in subGraph.nodes():
+      expectedNeighbors = list(subGraph.neighbors(node))
+      neighbors = [csrGraph.nodes[i] for i in csrGraph.neighbors(csrGraph.indexOf(node))]
+      self.assertEqual(expectedNeighbors, neighbors)
+
+  def test_HasEdge(self):
+    graph = nx.gnp_random_graph(60, 0.1, seed=3, directed=True)
+    csrGraph = CSRGraph.fromNetworkx(graph)
+    for u in graph.nodes():
+      for v in graph.nodes():
+        self.assertEqual(graph.has_edge(u, v), csrGraph.hasEdge(csrGraph.indexOf(u), csrGraph.indexOf(v)))
+
+  def test_EmptyGraph(self):
+    csrGraph = CSRGraph.fromNetworkx(nx.Graph())
+    self.assertEqual(0, csrGraph.numberOfNodes())
+    self.assertEqual(0, csrGraph.numberOfEdges())
+    self.assertRaises(nx.NetworkXError, csrGraph.indexOf, 'u1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,35 +1,134 @@
-
+import os
+import hashlib
 import requests
 from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from concurrent.futures import ThreadPoolExecutor
+
+# SOCIAL_NET_DATA_MIRROR points the downloads at a local directory, a file:// base URL
+# or another http(s) base URL holding the same file names, e.g. to run fully offline
+MIRROR_ENVIRONMENT = 'SOCIAL_NET_DATA_MIRROR'
+# Bytes read and written at a time, so a download never sits in memory as a whole
+CHUNK_SIZE = 1 << 20
+# Seconds to wait for the server to connect and to send the next chunk
+TIMEOUT = (10, 60)
+
+# Dataset is one downloadable dump and the SHA-256 of its expected content
+class Dataset:
+  def __init__(self, fileName: str, url: str, sha256: str) -> None:
+    self.fileName = fileName
+    self.url = url
+    self.sha256 = sha256
+
+TWITTER = Dataset('ego-twitter.p', 'https://assets.datacamp.com/production/repositories/580/datasets/64cf6963a7e8005e3771ef3b256812a5797320f0/ego-twitter.p',
+                  '1531582af7ff6abb9691c4afec6546dbee627cfbee8009bb456b516f78a1659e')
+FACEBOOK = Dataset('github_users.p', 'https://assets.datacamp.com/production/repositories/580/datasets/69ada08d5cce7f35f38ffefe8f2291b7cfcd6000/github_users.p',
+                   '47b319fe3c0ca42e24aaee9d707a8c4bf7622c151594400ea52832bd188d93e4')
+DATASETS = [TWITTER, FACEBOOK]
+
+class ChecksumMismatch(Exception):
+  pass
+
+def sha256sum(filePath: Path) -> str:
+  digest = hashlib.sha256()
+  with open(filePath, 'rb') as f:
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+# mirrorUrl is where a file lives in the mirror: a path for a directory or file:// mirror,
+# a URL otherwise
+def mirrorUrl(mirror: str, fileName: str) -> str:
+  if urlparse(mirror).scheme in ('http', 'https', 'file'):
+    return mirror.rstrip('/') + '/' + fileName
+  return str(Path(mirror) / fileName)
+
+# localPath returns the file behind a plain path or file:// URL, or None for a remote URL
+def localPath(url: str) -> Path:
+  parsed = urlparse(url)
+  if parsed.scheme == 'file':
+    return Path(url2pathname(parsed.path))
+  if parsed.scheme in ('http', 'https'):
+    return None
+  return Path(url)
+
+# streamInto appends the source to partPath from the given offset, and returns False when
+# the source could not resume there, so the copy has to start over
+def streamInto(session: requests.Session, url: str, partPath: Path, offset: int) -> bool:
+  sourcePath = localPath(url)
+  if sourcePath is not None:
+    with open(sourcePath, 'rb') as source, open(partPath, 'ab') as f:
+      source.seek(offset)
+      for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        f.write(chunk)
+    return True
+
+  headers = {'Range': f'bytes={offset}-'} if offset else {}
+  with session.get(url, stream=True, allow_redirects=True, headers=headers, timeout=TIMEOUT) as response:
+    # The part file already holds the whole content
+    if offset and response.status_code == 416:
+      return True
+    response.raise_for_status()
+    # A server without range support sends everything again
+    if offset and response.status_code != 206:
+      return False
+    with open(partPath, 'ab') as f:
+      for chunk in response.iter_content(CHUNK_SIZE):
+        f.write(chunk)
+  return True
+
+# fetchFile downloads url to dataPath through a <name>.part file that is only renamed into place
+# once its checksum matches, so an interrupted or corrupt download is never taken for the dataset.
+# A .part file left by an interrupted run is resumed with a Range request.
+# An existing file is kept when it matches the checksum (or when there is no checksum)
+def fetchFile(session: requests.Session, url: str, dataPath: Path, sha256: str = None) -> Path:
+  dataPath = Path(dataPath)
+  if dataPath.exists():
+    if sha256 is None or sha256sum(dataPath) == sha256:
+      print(f'File Exists: {dataPath.name}')
+      return dataPath
+    print(f'Checksum Mismatch: {dataPath.name}, downloading it again')
+
+  dataPath.parent.mkdir(parents=True, exist_ok=True)
+  partPath = dataPath.with_name(dataPath.name + '.part')
+  offset = partPath.stat().st_size if partPath.exists() else 0
+  if not streamInto(session, url, partPath, offset):
+    partPath.unlink()
+    streamInto(session, url, partPath, 0)
+
+  if sha256 is not None:
+    actualSha256 = sha256sum(partPath)
+    if actualSha256 != sha256:
+      partPath.unlink()
+      raise ChecksumMismatch(f"{url} has SHA-256 {actualSha256}, expected {sha256}")
+  os.replace(partPath, dataPath)
+  print(f'File Created: {dataPath.name}')
+  return dataPath
+
+# pooledSession shares one connection pool between the concurrent downloads
+def pooledSession(workers: int) -> requests.Session:
+  session = requests.Session()
+  adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+  session.mount('http://', adapter)
+  session.mount('https://', adapter)
+  return session
 
 def createDirSaveFile(dirPath: Path, url: str) -> None:
-    """
-    Check if the path exists and create it if it does not.
-    Check if the file exists and download it if it does not.
-    """
-    if not dirPath.parents[0].exists():
-        dirPath.parents[0].mkdir(parents=True)
-        print(f'Directory Created: {dirPath.parents[0]}')
-    else:
-        print('Directory Exists')
-
-    if not dirPath.exists():
-        r = requests.get(url, allow_redirects=True)
-        open(dirPath, 'wb').write(r.content)
-        print(f'File Created: {dirPath.name}')
-    else:
-        print('File Exists')
-
-def downloadDataset() -> list[str]:
-  facebook = 'https://assets.datacamp.com/production/repositories/580/datasets/69ada08d5cce7f35f38ffefe8f2291b7cfcd6000/github_users.p'
-  twitter = 'https://assets.datacamp.com/production/repositories/580/datasets/64cf6963a7e8005e3771ef3b256812a5797320f0/ego-twitter.p'
-  dataDir = Path('data/')
-  datasets = [twitter, facebook]
-  dataPaths = list()
-  for data in datasets:
-      fileName = data.split('/')[-1].replace('?raw=true', '')
-      dataPath = dataDir / fileName
-      createDirSaveFile(dataPath, data)
-      dataPaths.append(dataPath)
-
-  return dataPaths
\ No newline at end of file
+  """
+  Create the parent directory if it does not exist and download the file if it does not.
+  """
+  with requests.Session() as session:
+    fetchFile(session, url, dirPath)
+
+# downloadDataset fetches every dataset into dataDir concurrently, verifying each one,
+# from the mirror when one is given (or set in SOCIAL_NET_DATA_MIRROR), and returns
+# the paths in the order of datasets
+def downloadDataset(dataDir: Path = Path('data/'), mirror: str = None, datasets: list = None) -> list[Path]:
+  datasets = DATASETS if datasets is None else datasets
+  mirror = mirror or os.environ.get(MIRROR_ENVIRONMENT)
+  dataDir = Path(dataDir)
+  with pooledSession(max(len(datasets), 1)) as session, ThreadPoolExecutor(max_workers=max(len(datasets), 1)) as executor:
+    futures = [executor.submit(fetchFile, session, mirrorUrl(mirror, dataset.fileName) if mirror else dataset.url, dataDir / dataset.fileName, dataset.sha256)
+               for dataset in datasets]
+    return [future.result() for future in futures]
@@ -0,0 +1,89 @@
+import os
+import hashlib
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataset import Dataset, ChecksumMismatch, downloadDataset
+
+CONTENT = {'first.p': os.urandom(3 * 1024 * 1024 + 17), 'second.p': os.urandom(1000)}
+DATASETS = [Dataset(name, f'http://unused/{name}', hashlib.sha256(content).hexdigest()) for name, content in CONTENT.items()]
+
+# RangeHandler serves CONTENT and honours "Range: bytes=<start>-" requests
+class RangeHandler(BaseHTTPRequestHandler):
+  requestedRanges = []
+
+  def do_GET(self):
+    content = CONTENT.get(self.path.lstrip('/'))
+    if content is None:
+      self.send_error(404)
+      return
+    requestedRange = self.headers.get('Range')
+    self.requestedRanges.append(requestedRange)
+    start = int(requestedRange.split('=')[1].rstrip('-')) if requestedRange else 0
+    self.send_response(206 if requestedRange else 200)
+    self.send_header('Content-Length', str(len(content) - start))
+    self.end_headers()
+    self.wfile.write(content[start:])
+
+  def log_message(self, *args):
+    pass
+
+class TestDataset(unittest.TestCase):
+  def setUp(self):
+    self.tempDir = tempfile.TemporaryDirectory()
+    self.root = Path(self.tempDir.name)
+    self.mirror = self.root / 'mirror'
+    self.mirror.mkdir()
+    for name, content in CONTENT.items():
+      (self.mirror / name).write_bytes(content)
+    self.dataDir = self.root / 'data'
+
+  def tearDown(self):
+    self.tempDir.cleanup()
+
+  def assertDownloaded(self, paths):
+    self.assertEqual([self.dataDir / name for name in CONTENT], paths)
+    for name, content in CONTENT.items():
+      self.assertEqual(content, (self.dataDir / name).read_bytes())
+    self.assertEqual([], list(self.dataDir.glob('*.part')))
+
+  def test_LocalMirrorDirectoryAndFileUrl(self):
+    self.assertDownloaded(downloadDataset(self.dataDir, mirror=str(self.mirror), datasets=DATASETS))
+    for path in self.dataDir.iterdir():
+      path.unlink()
+    with mock.patch.dict(os.environ, {'SOCIAL_NET_DATA_MIRROR': self.mirror.as_uri()}):
+      self.assertDownloaded(downloadDataset(self.dataDir, datasets=DATASETS))
+
+  def test_CorruptFilesAreReplacedAndBadDownloadsRejected(self):
+    self.dataDir.mkdir()
+    (self.dataDir / 'first.p').write_bytes(b'truncated')
+    self.assertDownloaded(downloadDataset(self.dataDir, mirror=str(self.mirror), datasets=DATASETS))
+
+    (self.mirror / 'second.p').write_bytes(b'tampered')
+    (self.dataDir / 'second.p').unlink()
+    with self.assertRaises(ChecksumMismatch):
+      downloadDataset(self.dataDir, mirror=str(self.mirror), datasets=DATASETS)
+    self.assertFalse((self.dataDir / 'second.p').exists())
+    self.assertFalse((self.dataDir / 'second.p.part').exists())
+
+  def test_HttpDownloadResumesPartialFile(self):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+      RangeHandler.requestedRanges = []
+      self.dataDir.mkdir()
+      (self.dataDir / 'first.p.part').write_bytes(CONTENT['first.p'][:1024 * 1024])
+      paths = downloadDataset(self.dataDir, mirror=f'http://127.0.0.1:{server.server_port}/', datasets=DATASETS)
+      self.assertDownloaded(paths)
+      self.assertIn(f'bytes={1024 * 1024}-', RangeHandler.requestedRanges)
+      self.assertIn(None, RangeHandler.requestedRanges)
+    finally:
+      server.shutdown()
+      server.server_close()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,85 @@
+import numpy as np
+from csr_graph import CSRGraph
+
+# networkxDegrees returns the degree of every node the way networkx counts it
+# Time complexity: O(V + E)
+def networkxDegrees(csrGraph: CSRGraph) -> np.ndarray:
+  degrees = csrGraph.degrees().astype(np.int64)
+  if csrGraph.directed:
+    degrees += np.bincount(csrGraph.indices, minlength=csrGraph.numberOfNodes())
+  else:
+    rowIds = csrGraph.rowIds()
+    degrees += np.bincount(rowIds[csrGraph.indices == rowIds], minlength=csrGraph.numberOfNodes())
+  return degrees
+
+# DegreeIndex keeps every node in a bucket keyed by its degree (a bucket queue), together with
+# the highest non-empty bucket, so that an edge insert or delete moves two nodes between
+# neighbouring buckets in O(1) and "who has the most friends" never needs a pass over the graph.
+# Degrees follow networkx: in + out degree for directed graphs, self loops count twice.
+# Ties are reported in the order the nodes were added to the graph
+# Space complexity: O(V)
+class DegreeIndex:
+  def __init__(self, csrGraph: CSRGraph) -> None:
+    degrees = networkxDegrees(csrGraph)
+    self.degree = {}
+    self.order = {}
+    self.buckets = {}
+    self.maxDegree = 0
+    for node, degree in zip(csrGraph.nodes, degrees.tolist()):
+      self.addNode(node, degree)
+
+  def __len__(self) -> int:
+    return len(self.degree)
+
+  def __contains__(self, node) -> bool:
+    return node in self.degree
+
+  def addNode(self, node, degree: int = 0) -> None:
+    self.order[node] = len(self.order)
+    self.degree[node] = degree
+    self.buckets.setdefault(degree, {})[node] = None
+    self.maxDegree = max(self.maxDegree, degree)
+
+  # increment moves the node one bucket up
+  # Time complexity: O(1)
+  def increment(self, node) -> None:
+    degree = self.degree[node]
+    self.move(node, degree, degree + 1)
+    self.maxDegree = max(self.maxDegree, degree + 1)
+
+  # decrement moves the node one bucket down; the maximum drops by at most one,
+  # and only when the node was alone at the top
+  # Time complexity: O(1)
+  def decrement(self, node) -> None:
+    degree = self.degree[node]
+    self.move(node, degree, degree - 1)
+    if degree == self.maxDegree and not self.buckets.get(degree):
+      self.maxDegree = degree - 1
+
+  def move(self, node, oldDegree: int, newDegree: int) -> None:
+    bucket = self.buckets[oldDegree]
+    del bucket[node]
+    if not bucket:
+      del self.buckets[oldDegree]
+    self.buckets.setdefault(newDegree, {})[node] = None
+    self.degree[node] = newDegree
+
+  # maxDegreeNodes returns every node tied at the maximum degree
+  # Time complexity: O(t log t) for t tied nodes
+  def maxDegreeNodes(self) -> list[tuple]:
+    if not self.degree:
+      return []
+    tiedNodes = sorted(self.buckets[self.maxDegree], key=self.order.get)
+    return [(node, self.maxDegree) for node in tiedNodes]
+
+  # topK walks the non-empty buckets down from the maximum until k nodes are collected.
+  # There are at most O(sqrt(E)) distinct degrees, so this never touches every node
+  # Time complexity: O(D log D + k log k) for D distinct degrees
+  def topK(self, k: int) -> list[tuple]:
+    topNodes = []
+    for degree in sorted(self.buckets, reverse=True):
+      if len(topNodes) >= k:
+        break
+      tiedNodes = sorted(self.buckets[degree], key=self.order.get)
+      topNodes.extend((node, degree) for node in tiedNodes[:k - len(topNodes)])
+    return topNodes
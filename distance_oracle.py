@@ -0,0 +1,167 @@
+import hashlib
+import numpy as np
+from pathlib import Path
+from csr_graph import CSRGraph
+from centrality import gatherEdges
+from connectivity import ConnectivityIndex
+from degree_index import networkxDegrees
+from traversal import bidirectionalSearch
+
+ORACLE_VERSION = 2
+# Pairs answered per vectorized block, which bounds the (pairs x landmarks) temporaries
+PAIRS_PER_BLOCK = 1 << 16
+
+# landmarkDistances runs a level synchronous BFS from source, one vectorized step per level,
+# and returns the hop count to every node (-1 when unreachable)
+# Time complexity: O(V + E)
+def landmarkDistances(csrGraph: CSRGraph, source: int) -> np.ndarray:
+  distances = np.full(csrGraph.numberOfNodes(), -1, dtype=np.int64)
+  distances[source] = 0
+  frontier, depth = np.array([source], dtype=np.int64), 0
+  while len(frontier):
+    _, targets = gatherEdges(csrGraph, frontier)
+    targets = np.unique(targets[distances[targets] < 0])
+    depth += 1
+    distances[targets] = depth
+    frontier = targets
+  return distances
+
+# chooseLandmarks picks the users with the highest degree ('degree'), who sit on many shortest
+# paths and give tight bounds, or a seeded uniform sample ('random')
+def chooseLandmarks(csrGraph: CSRGraph, numberOfLandmarks: int, strategy: str = 'degree', seed: int = 0) -> np.ndarray:
+  numberOfNodes = csrGraph.numberOfNodes()
+  numberOfLandmarks = min(numberOfLandmarks, numberOfNodes)
+  if strategy == 'degree':
+    return np.argsort(-networkxDegrees(csrGraph), kind='stable')[:numberOfLandmarks]
+  if strategy == 'random':
+    return np.sort(np.random.default_rng(seed).choice(numberOfNodes, numberOfLandmarks, replace=False))
+  raise ValueError(f"Unknown landmark strategy {strategy}, expected 'degree' or 'random'")
+
+# compactDistances stores a (nodes x landmarks) distance table in the smallest unsigned type
+# that fits, with the largest value of the type standing for "unreachable"
+def compactDistances(distances: np.ndarray) -> np.ndarray:
+  longest = int(distances.max(initial=0))
+  for dtype in (np.uint8, np.uint16, np.uint32):
+    unreachable = np.iinfo(dtype).max
+    if longest < unreachable:
+      return np.where(distances < 0, unreachable, distances).astype(dtype)
+  raise ValueError(f"Distances up to {longest} hops can not be stored")
+
+# DistanceOracle answers batches of hop distance queries from the BFS distances of k landmarks.
+# For every landmark L the triangle inequality bounds d(u, v) from above by d(u, L) + d(L, v) and
+# from below by d(L, v) - d(L, u) and d(u, L) - d(v, L). When the best bounds meet, the distance is
+# exact without a search; otherwise a bidirectional search settles it (or the upper bound is
+# returned as an estimate). Pairs in different components are answered from the component labels.
+# For directed graphs the distances to the landmarks come from a BFS over the reversed edges.
+# Works on contiguous ids. Distances are -1 for unreachable pairs, like getDistanceWithCurrentNode
+# Space complexity: O(k * V) bytes (twice that for directed graphs)
+class DistanceOracle:
+  def __init__(self, csrGraph: CSRGraph, landmarks: np.ndarray, fromLandmarks: np.ndarray, toLandmarks: np.ndarray, componentLabels: np.ndarray) -> None:
+    self.csrGraph = csrGraph
+    self.landmarks = landmarks
+    # fromLandmarks[v, i] = d(landmark i, v), toLandmarks[v, i] = d(v, landmark i), nodes as rows
+    # so the landmarks of one node are contiguous
+    self.fromLandmarks = fromLandmarks
+    self.toLandmarks = toLandmarks
+    self.componentLabels = componentLabels
+    self.unreachable = np.iinfo(fromLandmarks.dtype).max
+
+  # build runs one BFS (two for directed graphs) per landmark
+  # Time complexity: O(k * (V + E))
+  @classmethod
+  def build(cls, csrGraph: CSRGraph, numberOfLandmarks: int = 16, strategy: str = 'degree', seed: int = 0, componentLabels: np.ndarray = None) -> 'DistanceOracle':
+    landmarks = chooseLandmarks(csrGraph, numberOfLandmarks, strategy, seed)
+    fromLandmarks = compactDistances(np.stack([landmarkDistances(csrGraph, landmark) for landmark in landmarks.tolist()], axis=1)
+                                     if len(landmarks) else np.zeros((csrGraph.numberOfNodes(), 0), dtype=np.int64))
+    toLandmarks = fromLandmarks
+    if csrGraph.directed and len(landmarks):
+      reverse = csrGraph.reverse()
+      toLandmarks = compactDistances(np.stack([landmarkDistances(reverse, landmark) for landmark in landmarks.tolist()], axis=1))
+      # Both tables share one type, so one sentinel marks "unreachable"
+      dtype = np.promote_types(fromLandmarks.dtype, toLandmarks.dtype)
+      fromLandmarks, toLandmarks = widen(fromLandmarks, dtype), widen(toLandmarks, dtype)
+    if componentLabels is None:
+      componentLabels = ConnectivityIndex(csrGraph).componentLabels()
+    return cls(csrGraph, landmarks, fromLandmarks, toLandmarks, np.asarray(componentLabels))
+
+  # bounds returns the lower and upper bound on the distance of every (source, target) pair,
+  # with inf for an unknown upper bound or an unreachable pair
+  # Time complexity: O(P * k)
+  def bounds(self, sources: np.ndarray, targets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+    lowerBounds = np.zeros(len(sources), dtype=np.float64)
+    upperBounds = np.full(len(sources), np.inf)
+    for start in range(0, len(sources), PAIRS_PER_BLOCK):
+      blockSources, blockTargets = sources[start:start + PAIRS_PER_BLOCK], targets[start:start + PAIRS_PER_BLOCK]
+      lower, upper = lowerBounds[start:start + PAIRS_PER_BLOCK], upperBounds[start:start + PAIRS_PER_BLOCK]
+      if len(self.landmarks):
+        sourceTo, targetFrom = self.hops(self.toLandmarks, blockSources), self.hops(self.fromLandmarks, blockTargets)
+        upper[:] = (sourceTo + targetFrom).min(axis=1)
+        sourceFrom, targetTo = self.hops(self.fromLandmarks, blockSources), self.hops(self.toLandmarks, blockTargets)
+        with np.errstate(invalid='ignore'):
+          # inf - inf says nothing about the pair
+          lower[:] = np.fmax(np.nanmax(np.fmax(targetFrom - sourceFrom, sourceTo - targetTo), axis=1, initial=0), 0)
+      disconnected = self.componentLabels[blockSources] != self.componentLabels[blockTargets]
+      lower[disconnected], upper[disconnected] = np.inf, np.inf
+      same = blockSources == blockTargets
+      lower[same], upper[same] = 0, 0
+    return lowerBounds, upperBounds
+
+  def hops(self, table: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    rows = table[nodes].astype(np.float64)
+    rows[table[nodes] == self.unreachable] = np.inf
+    return rows
+
+  # distances answers a batch of pairs. With exact=False the upper bound is returned when the
+  # bounds do not meet, which never underestimates. Connected pairs that no landmark reaches have
+  # no upper bound, so they are searched either way rather than reported unreachable
+  def distances(self, sources: np.ndarray, targets: np.ndarray, exact: bool = True, counters: dict = None) -> np.ndarray:
+    lower, upper = self.bounds(sources, targets)
+    answers = np.where(np.isinf(upper), -1, upper).astype(np.int64)
+    unresolved = (lower != upper) & ~np.isinf(lower)
+    if not exact:
+      unresolved &= np.isinf(upper)
+    unresolved = np.flatnonzero(unresolved)
+    if counters is not None:
+      counters['distanceOracle.queries'] += len(answers)
+      counters['distanceOracle.exactFallbacks'] += len(unresolved)
+    sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+    for pair in unresolved.tolist():
+      answers[pair], _ = bidirectionalSearch(self.csrGraph, int(sources[pair]), int(targets[pair]))
+    return answers
+
+  # save writes the landmark tables next to the size and digest of the graph they were built for
+  def save(self, oraclePath: Path) -> None:
+    np.savez(oraclePath, version=ORACLE_VERSION, directed=self.csrGraph.directed,
+             numberOfNodes=self.csrGraph.numberOfNodes(), numberOfEdges=self.csrGraph.numberOfEdges(),
+             graphDigest=graphDigest(self.csrGraph),
+             landmarks=self.landmarks, fromLandmarks=self.fromLandmarks, toLandmarks=self.toLandmarks,
+             componentLabels=self.componentLabels)
+
+  # load reads an oracle saved for the same graph; any other graph, even one of the same size,
+  # is rejected, since the stored distances would be wrong for it
+  @classmethod
+  def load(cls, oraclePath: Path, csrGraph: CSRGraph) -> 'DistanceOracle':
+    with np.load(oraclePath, allow_pickle=False) as arrays:
+      if int(arrays['version']) != ORACLE_VERSION:
+        raise ValueError(f"Unsupported distance oracle version {int(arrays['version'])} in {oraclePath}")
+      stored = (bool(arrays['directed']), int(arrays['numberOfNodes']), int(arrays['numberOfEdges']))
+      if stored != (csrGraph.directed, csrGraph.numberOfNodes(), csrGraph.numberOfEdges()) or str(arrays['graphDigest']) != graphDigest(csrGraph):
+        raise ValueError(f"The distance oracle in {oraclePath} was built for another graph")
+      return cls(csrGraph, arrays['landmarks'], arrays['fromLandmarks'], arrays['toLandmarks'], arrays['componentLabels'])
+
+# graphDigest hashes the node ids and the CSR arrays, so a rewired or relabelled graph of the
+# same size gets another digest
+# Time complexity: O(V + E)
+def graphDigest(csrGraph: CSRGraph) -> str:
+  digest = hashlib.sha256()
+  digest.update(repr(list(csrGraph.nodes)).encode())
+  digest.update(np.ascontiguousarray(csrGraph.offsets, dtype=np.int64).tobytes())
+  digest.update(np.ascontiguousarray(csrGraph.indices, dtype=np.int64).tobytes())
+  return digest.hexdigest()
+
+# widen converts a distance table to a larger type, keeping "unreachable" the largest value
+def widen(table: np.ndarray, dtype: np.dtype) -> np.ndarray:
+  if table.dtype == dtype:
+    return table
+  return np.where(table == np.iinfo(table.dtype).max, np.iinfo(dtype).max, table).astype(dtype)
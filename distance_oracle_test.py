@@ -0,0 +1,95 @@
+import random
+import unittest
+import tempfile
+import numpy as np
+import networkx as nx
+from pathlib import Path
+from social_net import SocialNetwork
+from distance_oracle import DistanceOracle, compactDistances
+
+def exactDistance(graph: nx.Graph, source, target) -> int:
+  try:
+    return nx.shortest_path_length(graph, source, target)
+  except nx.NetworkXNoPath:
+    return -1
+
+class TestDistanceOracle(unittest.TestCase):
+  def assertBoundsHold(self, graph: nx.Graph, oracle: DistanceOracle, pairs: list):
+    csrGraph = oracle.csrGraph
+    sources = np.array([csrGraph.indexOf(first) for first, _ in pairs])
+    targets = np.array([csrGraph.indexOf(second) for _, second in pairs])
+    lower, upper = oracle.bounds(sources, targets)
+    for (first, second), low, high in zip(pairs, lower.tolist(), upper.tolist()):
+      distance = exactDistance(graph, first, second)
+      if distance < 0:
+        self.assertEqual(np.inf, high)
+      else:
+        self.assertLessEqual(low, distance)
+        self.assertGreaterEqual(high, distance)
+
+  def test_UndirectedDistancesMatchNetworkx(self):
+    graph = nx.connected_watts_strogatz_graph(600, 6, 0.1, seed=1)
+    graph.add_edges_from([(1000, 1001), (1001, 1002)])
+    sn = SocialNetwork(graph)
+    nodes = list(graph)
+    rng = random.Random(2)
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(500)] + [(0, 1002), (1000, 1002), (5, 5)]
+    self.assertEqual([exactDistance(graph, first, second) for first, second in pairs], sn.getDistances(pairs))
+    self.assertBoundsHold(graph, sn._distanceOracle, pairs)
+    # The approximate answers never underestimate
+    for (first, second), estimate in zip(pairs, sn.getDistances(pairs, exact=False)):
+      self.assertGreaterEqual(estimate, exactDistance(graph, first, second))
+
+  def test_ApproximateDistancesSearchPairsNoLandmarkReaches(self):
+    graph = nx.star_graph(20)
+    graph.add_edges_from([(100, 101), (101, 102), (102, 103), (200, 201)])
+    sn = SocialNetwork(graph)
+    sn.buildDistanceOracle(landmarks=1)
+    nodes = list(graph)
+    pairs = [(first, second) for first in nodes for second in nodes]
+    for (first, second), estimate in zip(pairs, sn.getDistances(pairs, exact=False)):
+      distance = exactDistance(graph, first, second)
+      self.assertEqual(distance < 0, estimate < 0)
+      self.assertGreaterEqual(estimate, distance)
+    self.assertEqual([1, 3, -1], sn.getDistances([(100, 101), (100, 103), (100, 200)], exact=False))
+
+  def test_DirectedDistancesUseBothDirections(self):
+    graph = nx.gnp_random_graph(300, 0.01, seed=3, directed=True)
+    sn = SocialNetwork(graph)
+    sn.buildDistanceOracle(landmarks=8, strategy='random', seed=4)
+    self.assertEqual(sn._distanceOracle.fromLandmarks.dtype, sn._distanceOracle.toLandmarks.dtype)
+    pairs = [(first, second) for first in range(0, 300, 7) for second in range(0, 300, 11)]
+    self.assertEqual([exactDistance(graph, first, second) for first, second in pairs], sn.getDistances(pairs))
+    self.assertBoundsHold(graph, sn._distanceOracle, pairs)
+
+  def test_CompactTypeAndPersistence(self):
+    self.assertEqual(np.uint8, compactDistances(np.array([[0, 254, -1]])).dtype)
+    self.assertEqual(np.uint16, compactDistances(np.array([[0, 255]])).dtype)
+    pathGraph = nx.path_graph(400)
+    sn = SocialNetwork(pathGraph)
+    sn.buildDistanceOracle(landmarks=2)
+    self.assertEqual(np.uint16, sn._distanceOracle.fromLandmarks.dtype)
+    with tempfile.TemporaryDirectory() as tempDir:
+      oraclePath = Path(tempDir) / 'oracle.npz'
+      sn.saveDistanceOracle(oraclePath)
+      restored = SocialNetwork(pathGraph)
+      restored.loadDistanceOracle(oraclePath)
+      pairs = [(0, 399), (10, 20), (399, 3)]
+      self.assertEqual([399, 10, 396], restored.getDistances(pairs))
+      self.assertRaises(ValueError, SocialNetwork(nx.path_graph(10)).loadDistanceOracle, oraclePath)
+      # Same size, but rewired or relabelled
+      rewired = nx.path_graph(400)
+      rewired.remove_edge(0, 1)
+      rewired.add_edge(0, 2)
+      self.assertRaises(ValueError, SocialNetwork(rewired).loadDistanceOracle, oraclePath)
+      relabelled = nx.relabel_nodes(pathGraph, {node: 399 - node for node in pathGraph})
+      self.assertRaises(ValueError, SocialNetwork(relabelled).loadDistanceOracle, oraclePath)
+
+  def test_EdgeChangesDropTheOracle(self):
+    sn = SocialNetwork(nx.path_graph(10))
+    self.assertEqual([9], sn.getDistances([(0, 9)]))
+    sn.addEdge(0, 9)
+    self.assertEqual([1], sn.getDistances([(0, 9)]))
+
+if __name__ == '__main__':
+  unittest.main()
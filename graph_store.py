@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import shutil
+import uuid
+import datetime
+import pickle
+import numpy as np
+import networkx as nx
+from pathlib import Path
+from csr_graph import CSRGraph
+from dataset import sha256sum
+
+# The binary graph store is a directory holding a JSON header and one .npy file per array:
+#   header.json                      format version, direction, sizes, attribute columns and source
+#   offsets.npy, indices.npy         the CSR adjacency (successors for directed graphs)
+#   nodes.npy                        contiguous id -> original node id
+#   attribute.<name>.npy             node attribute side column
+#   attribute.<name>.present.npy     whether the node has the attribute at all
+#   edgeAttribute.<name>(.present).npy  the same for edge attributes, aligned with indices.npy
+# Loading memory maps every array, so startup does not depend on the graph size
+# and processes opening the same store share the same page cache.
+# Files of a written store are never rewritten: saving again writes a new directory and swaps it
+# into place, so processes that still map the old arrays keep reading them
+STORE_VERSION = 1
+HEADER = 'header.json'
+
+# saveGraph converts a networkx graph into the binary store at storePath.
+# Node ids must be all ints or all strings, and only str/int/float/bool/date attributes are kept.
+# source describes what the store was converted from, see openStore
+def saveGraph(graph: nx.Graph, storePath: Path, source: dict = None) -> CSRGraph:
+  storePath = Path(storePath)
+  storePath.parent.mkdir(parents=True, exist_ok=True)
+  # The suffix keeps a directory left by an interrupted save ignored like the stores themselves
+  newStorePath = siblingPath(storePath, 'csr')
+  newStorePath.mkdir()
+  try:
+    csrGraph = writeStore(graph, newStorePath, source)
+    replaceDirectory(newStorePath, storePath)
+  except BaseException:
+    shutil.rmtree(newStorePath, ignore_errors=True)
+    raise
+  return csrGraph
+
+# replaceDirectory moves newPath to path. The old directory is renamed away before it is deleted:
+# its files are unlinked, not truncated, so existing memory maps of them stay valid
+def replaceDirectory(newPath: Path, path: Path) -> None:
+  if not path.exists():
+    os.replace(newPath, path)
+    return
+  oldPath = siblingPath(path, 'old')
+  os.replace(path, oldPath)
+  os.replace(newPath, path)
+  shutil.rmtree(oldPath, ignore_errors=True)
+
+# siblingPath returns an unused hidden path next to path
+def siblingPath(path: Path, suffix: str) -> Path:
+  return path.with_name(f'.{path.name}.{uuid.uuid4().hex}.{suffix}')
+
+def writeStore(graph: nx.Graph, storePath: Path, source: dict) -> CSRGraph:
+  csrGraph = CSRGraph.fromNetworkx(graph)
+
+  nodes = np.array(csrGraph.nodes)
+  if len(nodes) and nodes.dtype.kind not in 'iU':
+    raise ValueError(f"Node ids must be all integers or all strings, found {nodes.dtype}")
+  np.save(storePath / 'nodes.npy', nodes if len(nodes) else np.zeros(0, dtype=np.int64))
+  np.save(storePath / 'offsets.npy', csrGraph.offsets)
+  np.save(storePath / 'indices.npy', csrGraph.indices)
+
+  attributes = saveColumns(storePath, 'attribute', nodeColumnValues(graph, csrGraph.nodes))
+  edgeAttributes = saveColumns(storePath, 'edgeAttribute', edgeColumnValues(graph, csrGraph))
+
+  header = {
+    'version': STORE_VERSION,
+    'directed': csrGraph.directed,
+    'numberOfNodes': csrGraph.numberOfNodes(),
+    'numberOfEdges': csrGraph.numberOfEdges(),
+    'attributes': attributes,
+    'edgeAttributes': edgeAttributes,
+    'source': source,
+  }
+  writeHeader(storePath, header)
+  return csrGraph
+
+# writeHeader replaces the header in one rename. It is written last, so a store without one
+# is an unfinished conversion
+def writeHeader(storePath: Path, header: dict) -> None:
+  partPath = storePath / (HEADER + '.part')
+  with open(partPath, 'w') as f:
+    json.dump(header, f, indent=2)
+  os.replace(partPath, storePath / HEADER)
+
+def nodeColumnValues(graph: nx.Graph, nodes: list) -> dict:
+  names = sorted({name for _, data in graph.nodes(data=True) for name in data})
+  return {name: [graph.nodes[node].get(name) for node in nodes] for name in names}
+
+# edgeColumnValues lists the edge attributes in the order of the CSR entries
+def edgeColumnValues(graph: nx.Graph, csrGraph: CSRGraph) -> dict:
+  names = sorted({name for _, _, data in graph.edges(data=True) for name in data})
+  if not names:
+    return {}
+  nodes, adjacency = csrGraph.nodes, graph.adj
+  edgeData = [adjacency[nodes[source]][nodes[target]] for source, target in zip(csrGraph.rowIds().tolist(), csrGraph.indices.tolist())]
+  return {name: [data.get(name) for data in edgeData] for name in names}
+
+# saveColumns writes one typed column and presence mask per attribute
+def saveColumns(storePath: Path, prefix: str, columnValues: dict) -> dict:
+  dtypes = {}
+  for name, rawValues in columnValues.items():
+    column = typedColumn(rawValues)
+    if column is None:
+      print(f"Skipping {prefix} {name}: only str, int, float, bool and date values can be stored")
+      continue
+    values, present = column
+    np.save(storePath / f'{prefix}.{name}.npy', values)
+    np.save(storePath / f'{prefix}.{name}.present.npy', present)
+    dtypes[name] = values.dtype.str
+  return dtypes
+
+# typedColumn turns a list of attribute values (None when missing) into a typed column
+def typedColumn(rawValues: list) -> tuple:
+  present = np.array([value is not None for value in rawValues], dtype=bool)
+  sample = [value for value in rawValues if value is not None]
+  if all(isinstance(value, str) for value in sample):
+    return np.array([value if value is not None else '' for value in rawValues], dtype=str), present
+  if all(isinstance(value, (bool, int, float, np.number)) for value in sample):
+    return np.array([value if value is not None else 0 for value in rawValues]), present
+  if all(isinstance(value, datetime.datetime) for value in sample):
+    return np.array(rawValues, dtype='datetime64[us]'), present
+  if all(isinstance(value, datetime.date) for value in sample):
+    return np.array(rawValues, dtype='datetime64[D]'), present
+  return None
+
+def isStore(storePath: Path) -> bool:
+  return (Path(storePath) / HEADER).exists()
+
+def readHeader(storePath: Path) -> dict:
+  with open(Path(storePath) / HEADER) as f:
+    return json.load(f)
+
+# pickleSource identifies a dump by its size and modification time, and its SHA-256 when asked
+def pickleSource(picklePath: Path, withSha256: bool = True) -> dict:
+  stat = Path(picklePath).stat()
+  source = {'fileName': Path(picklePath).name, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+  if withSha256:
+    source['sha256'] = sha256sum(picklePath)
+  return source
+
+# isFresh tells whether the store was converted from the dump as it is now. The dump is only
+# hashed when its size or modification time changed; a dump that was only touched is recorded
+# with its new time, so it is not hashed again
+def isFresh(storePath: Path, picklePath: Path) -> bool:
+  header = readHeader(storePath)
+  recorded = header.get('source') or {}
+  current = pickleSource(picklePath, withSha256=False)
+  if all(recorded.get(key) == value for key, value in current.items()):
+    return True
+  if 'sha256' not in recorded or recorded['sha256'] != sha256sum(picklePath):
+    return False
+  writeHeader(Path(storePath), dict(header, source=dict(recorded, **current)))
+  return True
+
+# loadGraph memory maps a store written by saveGraph
+# Time complexity: O(V) for the node id list, the adjacency arrays are mapped lazily
+def loadGraph(storePath: Path, mmap: bool = True) -> CSRGraph:
+  storePath = Path(storePath)
+  with open(storePath / HEADER) as f:
+    header = json.load(f)
+  if header['version'] != STORE_VERSION:
+    raise ValueError(f"Unsupported graph store version {header['version']} in {storePath}")
+
+  mmapMode = 'r' if mmap else None
+  load = lambda name: np.load(storePath / name, mmap_mode=mmapMode, allow_pickle=False)
+  loadColumns = lambda prefix, names: {name: (load(f'{prefix}.{name}.npy'), load(f'{prefix}.{name}.present.npy')) for name in names}
+  return CSRGraph(load('nodes.npy').tolist(), load('offsets.npy'), load('indices.npy'), directed=header['directed'],
+                  nodeAttributes=loadColumns('attribute', header['attributes']),
+                  edgeAttributes=loadColumns('edgeAttribute', header['edgeAttributes']))
+
+# convertPickle writes the store for one of the pickled networkx dumps in data/
+def convertPickle(picklePath: Path, storePath: Path = None) -> Path:
+  picklePath = Path(picklePath)
+  storePath = Path(storePath) if storePath else picklePath.with_suffix('.csr')
+  # Identified before loading, so a dump replaced meanwhile is converted again on the next open
+  source = pickleSource(picklePath)
+  with open(picklePath, 'rb') as f:
+    graph = pickle.load(f)
+  saveGraph(graph, storePath, source)
+  print(f'Store Created: {storePath}')
+  return storePath
+
+# openStore returns the store next to a pickled dump, converting it the first time
+# and again whenever the dump is no longer the one the store was converted from
+def openStore(picklePath: Path) -> CSRGraph:
+  storePath = Path(picklePath).with_suffix('.csr')
+  if not isStore(storePath) or not isFresh(storePath, picklePath):
+    convertPickle(picklePath, storePath)
+  return loadGraph(storePath)
+
+if __name__ == "__main__":
+  for picklePath in sys.argv[1:]:
+    convertPickle(picklePath)
@@ -0,0 +1,104 @@
+import os
+import unittest
+import pickle
+import tempfile
+import numpy as np
+import networkx as nx
+from pathlib import Path
+from unittest import mock
+from social_net import SocialNetwork
+from dataset import downloadDataset
+from graph_store import saveGraph, loadGraph, isStore, openStore
+
+class TestGraphStore(unittest.TestCase):
+  def test_RoundTripKeepsAdjacencyAndAttributes(self):
+    dataset = downloadDataset()
+    with open(dataset[0], 'rb') as f:
+      twitterGraph = pickle.load(f)
+    twitterSubGraph = twitterGraph.subgraph(list(twitterGraph.nodes())[:2000])
+    with tempfile.TemporaryDirectory() as tempDir:
+      storePath = Path(tempDir) / 'ego-twitter.csr'
+      savedGraph = saveGraph(twitterSubGraph, storePath)
+      self.assertTrue(isStore(storePath))
+      loadedGraph = loadGraph(storePath)
+      self.assertIsInstance(loadedGraph.offsets, np.memmap)
+      self.assertTrue(loadedGraph.directed)
+      self.assertEqual(savedGraph.nodes, loadedGraph.nodes)
+      self.assertEqual(savedGraph.offsets.tolist(), loadedGraph.offsets.tolist())
+      self.assertEqual(savedGraph.indices.tolist(), loadedGraph.indices.tolist())
+      self.assertEqual({'category', 'occupation'}, set(loadedGraph.nodeAttributes))
+      self.assertEqual({'date'}, set(loadedGraph.edgeAttributes))
+
+      rebuiltGraph = loadedGraph.toNetworkx()
+      self.assertTrue(nx.utils.graphs_equal(nx.DiGraph(twitterSubGraph), rebuiltGraph))
+      # Attribute filters read the stored columns
+      scientists = SocialNetwork(csrGraph=loadedGraph).attributeMask(category='D', occupation='scientist')
+      self.assertEqual([data.get('category') == 'D' and data.get('occupation') == 'scientist' for _, data in twitterSubGraph.nodes(data=True)], scientists.tolist())
+      del loadedGraph, rebuiltGraph
+
+  def test_SocialNetworkFromStore(self):
+    dataset = downloadDataset()
+    with open(dataset[1], 'rb') as f:
+      fbGraph = pickle.load(f)
+    fbSubGraph = fbGraph.subgraph(list(fbGraph.nodes())[:1000])
+    with tempfile.TemporaryDirectory() as tempDir:
+      storePath = Path(tempDir) / 'github_users.csr'
+      saveGraph(fbGraph, storePath)
+      fbCSRGraph = loadGraph(storePath)
+      sn = SocialNetwork(csrGraph=fbCSRGraph.subgraph(np.arange(1000)))
+      expectedSn = SocialNetwork(fbSubGraph)
+      # Subgraph views iterate their nodes in set order, so only the contents can be compared
+      self.assertEqual(set(expectedSn.recommendedFriends()), set(sn.recommendedFriends()))
+      self.assertEqual(set(expectedSn.findImportantPeople()), set(sn.findImportantPeople()))
+      self.assertEqual(len(SocialNetwork.fromStore(storePath).fbGraph), len(fbGraph))
+      del fbCSRGraph, sn
+
+  def test_OpenStoreReconvertsChangedPickle(self):
+    with tempfile.TemporaryDirectory() as tempDir:
+      picklePath = Path(tempDir) / 'graph.p'
+      with open(picklePath, 'wb') as f:
+        pickle.dump(nx.path_graph(5), f)
+      self.assertEqual(5, openStore(picklePath).numberOfNodes())
+      self.assertEqual(5, openStore(picklePath).numberOfNodes())
+      with open(picklePath, 'wb') as f:
+        pickle.dump(nx.path_graph(8), f)
+      self.assertEqual(8, openStore(picklePath).numberOfNodes())
+
+  def test_ReconversionKeepsOpenStoresReadable(self):
+    with tempfile.TemporaryDirectory() as tempDir:
+      picklePath = Path(tempDir) / 'graph.p'
+      with open(picklePath, 'wb') as f:
+        pickle.dump(nx.path_graph(1000), f)
+      oldGraph = openStore(picklePath)
+      oldIndices = oldGraph.indices.tolist()
+      with open(picklePath, 'wb') as f:
+        pickle.dump(nx.complete_graph(50), f)
+      self.assertEqual(50, openStore(picklePath).numberOfNodes())
+      # The old arrays were unlinked, not overwritten, so their mapping still reads the old store
+      self.assertEqual(oldIndices, oldGraph.indices.tolist())
+      self.assertEqual(['graph.csr', 'graph.p'], sorted(os.listdir(tempDir)))
+      del oldGraph
+
+  def test_TouchedPickleIsHashedOnce(self):
+    with tempfile.TemporaryDirectory() as tempDir:
+      picklePath = Path(tempDir) / 'graph.p'
+      with open(picklePath, 'wb') as f:
+        pickle.dump(nx.path_graph(5), f)
+      openStore(picklePath)
+      os.utime(picklePath, ns=(0, 0))
+      with mock.patch('graph_store.convertPickle') as convertPickle:
+        self.assertEqual(5, openStore(picklePath).numberOfNodes())
+        with mock.patch('graph_store.sha256sum') as sha256sum:
+          openStore(picklePath)
+      convertPickle.assert_not_called()
+      sha256sum.assert_not_called()
+
+  def test_EmptyGraph(self):
+    with tempfile.TemporaryDirectory() as tempDir:
+      saveGraph(nx.Graph(), tempDir)
+      sn = SocialNetwork.fromStore(tempDir)
+      self.assertEqual([], sn.findImportantPeople())
+      self.assertEqual([], sn.recommendedFriends())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import atexit
+import cProfile
+import functools
+import tracemalloc
+from pathlib import Path
+from collections import defaultdict
+
+# SOCIAL_NET_INSTRUMENT turns instrumentation on for every SocialNetwork: "1" records method
+# timings, peak memory and algorithm counters, "profile" also runs cProfile around the calls.
+# SOCIAL_NET_INSTRUMENT_REPORT is where the shared report is written when the process exits
+# (the pstats dump goes next to it with a .prof suffix)
+ENVIRONMENT_FLAG = 'SOCIAL_NET_INSTRUMENT'
+ENVIRONMENT_REPORT = 'SOCIAL_NET_INSTRUMENT_REPORT'
+
+# MethodStats accumulates the calls of one instrumented method. The peak is the largest
+# growth of traced memory over the memory in use when a call started
+class MethodStats:
+  def __init__(self) -> None:
+    self.calls = 0
+    self.seconds = 0.0
+    self.maxSeconds = 0.0
+    self.peakBytes = 0
+
+  def toDict(self) -> dict:
+    return {'calls': self.calls, 'seconds': self.seconds, 'maxSeconds': self.maxSeconds, 'peakBytes': self.peakBytes}
+
+# Instrumentation records, per method, the number of calls, wall time and tracemalloc peak,
+# and named algorithm counters that the kernels add to (see counters).
+# SocialNetwork only wraps its methods when an instance is enabled, so a disabled network
+# runs the plain methods and the kernels get no counters to update
+class Instrumentation:
+  def __init__(self, traceMemory: bool = True, profile: bool = False) -> None:
+    self.traceMemory = traceMemory
+    self.methods = defaultdict(MethodStats)
+    # Counter name -> total, e.g. 'bfs.verticesExpanded'
+    self.counters = defaultdict(int)
+    self.profiler = cProfile.Profile() if profile else None
+    # [start memory, peak memory] of the calls in progress, outermost first
+    self._frames = []
+    self._startedTracing = False
+
+  # wrap returns the bound method measured on every call. Calls made from inside another
+  # instrumented method are measured too, and their time also counts for the caller
+  def wrap(self, method, name: str = None):
+    name = name or method.__name__
+
+    @functools.wraps(method)
+    def measured(*args, **kwargs):
+      self._enter()
+      start = time.perf_counter()
+      try:
+        return method(*args, **kwargs)
+      finally:
+        self._exit(name, time.perf_counter() - start)
+    return measured
+
+  def _enter(self) -> None:
+    if not self._frames:
+      if self.traceMemory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        self._startedTracing = True
+      if self.profiler is not None:
+        self.profiler.enable()
+    if self.traceMemory:
+      current, peak = tracemalloc.get_traced_memory()
+      # The caller keeps the peak reached so far, the callee starts its own from here
+      if self._frames:
+        self._frames[-1][1] = max(self._frames[-1][1], peak)
+      tracemalloc.reset_peak()
+      self._frames.append([current, current])
+    else:
+      self._frames.append([0, 0])
+
+  def _exit(self, name: str, seconds: float) -> None:
+    start, peak = self._frames.pop()
+    if self.traceMemory:
+      peak = max(peak, tracemalloc.get_traced_memory()[1])
+      if self._frames:
+        self._frames[-1][1] = max(self._frames[-1][1], peak)
+    stats = self.methods[name]
+    stats.calls += 1
+    stats.seconds += seconds
+    stats.maxSeconds = max(stats.maxSeconds, seconds)
+    stats.peakBytes = max(stats.peakBytes, peak - start)
+    if not self._frames:
+      if self.profiler is not None:
+        self.profiler.disable()
+      if self._startedTracing:
+        tracemalloc.stop()
+        self._startedTracing = False
+
+  def count(self, name: str, amount: int = 1) -> None:
+    self.counters[name] += amount
+
+  def reset(self) -> None:
+    self.methods.clear()
+    self.counters.clear()
+    if self.profiler is not None:
+      self.profiler = cProfile.Profile()
+
+  # report is the structured view of everything recorded so far
+  def report(self) -> dict:
+    return {
+      'methods': {name: stats.toDict() for name, stats in sorted(self.methods.items())},
+      'counters': dict(sorted(self.counters.items())),
+    }
+
+  def saveReport(self, reportPath: Path) -> None:
+    with open(reportPath, 'w') as f:
+      json.dump(self.report(), f, indent=2)
+
+  # dumpStats writes the cProfile data in the pstats format (only when profiling)
+  def dumpStats(self, statsPath: Path) -> None:
+    if self.profiler is None:
+      raise ValueError("Profiling is not enabled for this instrumentation")
+    self.profiler.dump_stats(str(statsPath))
+
+# The instrumentation shared by every network enabled through the environment
+sharedInstrumentation = None
+
+# instrumentationFromEnvironment returns the shared instrumentation when SOCIAL_NET_INSTRUMENT is set,
+# creating it (and its report at exit) the first time, or None when instrumentation is off
+def instrumentationFromEnvironment() -> Instrumentation:
+  global sharedInstrumentation
+  flag = os.environ.get(ENVIRONMENT_FLAG, '').strip().lower()
+  if flag in ('', '0', 'false', 'no', 'off'):
+    return None
+  if sharedInstrumentation is None:
+    sharedInstrumentation = Instrumentation(profile=flag == 'profile')
+    reportPath = os.environ.get(ENVIRONMENT_REPORT)
+    if reportPath:
+      atexit.register(saveAtExit, sharedInstrumentation, Path(reportPath))
+  return sharedInstrumentation
+
+def saveAtExit(instrumentation: Instrumentation, reportPath: Path) -> None:
+  instrumentation.saveReport(reportPath)
+  if instrumentation.profiler is not None:
+    instrumentation.dumpStats(reportPath.with_suffix('.prof'))
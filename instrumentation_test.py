@@ -0,0 +1,80 @@
+import os
+import pstats
+import tempfile
+import unittest
+import json
+import networkx as nx
+from pathlib import Path
+from unittest import mock
+from social_net import SocialNetwork, INSTRUMENTED_METHODS
+import instrumentation
+from instrumentation import Instrumentation
+
+class TestInstrumentation(unittest.TestCase):
+  def test_DisabledNetworkRunsThePlainMethods(self):
+    with mock.patch.dict(os.environ, {'SOCIAL_NET_INSTRUMENT': '0'}):
+      sn = SocialNetwork(nx.path_graph(10))
+    self.assertIsNone(sn.instrumentation)
+    for name in INSTRUMENTED_METHODS:
+      self.assertNotIn(name, vars(sn))
+    self.assertEqual(9, sn.getDistanceWithCurrentNode(0, 9))
+
+  def test_RecordsMethodsAndCounters(self):
+    sn = SocialNetwork(nx.barabasi_albert_graph(300, 4, seed=1), instrument=True)
+    self.assertEqual(sn.recommendedFriends(), SocialNetwork(sn.fbGraph, instrument=False).recommendedFriends())
+    sn.getShortestPath(0, 299)
+    sn.pathExistBFS(0, 299)
+    list(sn.traverseBFS(0))
+    sn.connectCommunities(pivots=20)
+
+    report = sn.instrumentation.report()
+    methods, counters = report['methods'], report['counters']
+    for name in ['recommendedFriends', 'getShortestPath', 'pathExistBFS', 'connectCommunities', 'findLargestCliques', 'betweennessCentrality']:
+      self.assertGreaterEqual(methods[name]['calls'], 1)
+      self.assertGreater(methods[name]['seconds'], 0)
+    self.assertGreater(methods['recommendedFriends']['peakBytes'], 0)
+    # connectCommunities covers the calls it makes
+    self.assertGreaterEqual(methods['connectCommunities']['seconds'], methods['findLargestCliques']['seconds'])
+
+    degrees = [degree for _, degree in sn.fbGraph.degree()]
+    self.assertEqual(sum(degree * (degree - 1) // 2 for degree in degrees), counters['recommendedFriends.pairsExamined'])
+    # The full traversal expands every node, pathExistBFS at least the first one
+    self.assertGreaterEqual(counters['bfs.verticesExpanded'], 301)
+    self.assertGreaterEqual(counters['bfs.frontierPushes'], 299)
+    self.assertGreater(counters['shortestPath.frontierPushes'], 0)
+    self.assertGreater(counters['cliques.maximalCliques'], 0)
+    self.assertEqual(20, counters['betweenness.pivots'])
+
+  def test_EnvironmentSharesInstrumentationAndExportsReports(self):
+    with mock.patch.dict(os.environ, {'SOCIAL_NET_INSTRUMENT': 'profile'}), mock.patch.object(instrumentation, 'sharedInstrumentation', None):
+      firstNetwork = SocialNetwork(nx.cycle_graph(20))
+      secondNetwork = SocialNetwork(nx.cycle_graph(30))
+      self.assertIs(firstNetwork.instrumentation, secondNetwork.instrumentation)
+      firstNetwork.findImportantPeople()
+      secondNetwork.findImportantPeople()
+      self.assertEqual(2, firstNetwork.instrumentation.report()['methods']['findImportantPeople']['calls'])
+
+      with tempfile.TemporaryDirectory() as tempDir:
+        reportPath, statsPath = Path(tempDir) / 'report.json', Path(tempDir) / 'report.prof'
+        firstNetwork.instrumentation.saveReport(reportPath)
+        firstNetwork.instrumentation.dumpStats(statsPath)
+        with open(reportPath) as f:
+          self.assertIn('findImportantPeople', json.load(f)['methods'])
+        functionNames = {function for _, _, function in pstats.Stats(str(statsPath)).stats}
+        self.assertIn('findImportantPeople', functionNames)
+
+  def test_NestedCallsKeepTheCallerPeak(self):
+    tracker = Instrumentation()
+    def inner():
+      return len(bytearray(1 << 20))
+    def outer():
+      data = bytearray(4 << 20)
+      return tracker.wrap(inner, 'inner')() + len(data)
+    tracker.wrap(outer, 'outer')()
+    methods = tracker.report()['methods']
+    self.assertGreaterEqual(methods['outer']['peakBytes'], 5 << 20)
+    self.assertGreaterEqual(methods['inner']['peakBytes'], 1 << 20)
+    self.assertLess(methods['inner']['peakBytes'], 4 << 20)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,270 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from csr_graph import CSRGraph
+from shared_arrays import SharedArrays, attachWorker, workerArrays
+
+# Bytes the batched kernel may spend on the pairs of one chunk. Each pair lives in about eight
+# int64 arrays at once (positions, steps, friends, keys, order, unique), hence the number of
+# neighbour pairs materialized at once
+CHUNK_BYTES = 64 << 20
+PAIRS_PER_CHUNK = CHUNK_BYTES // (8 * np.dtype(np.int64).itemsize)
+# Shards handed out per worker, so that a shard full of hubs does not hold up the others
+SHARDS_PER_WORKER = 4
+
+# FriendOfFriendCounts holds, for every ordered pair (a, b) of users that are not friends,
+# the number of common friends w that list a before b, and the position of the
+# first such pair in the node-by-node enumeration, so results keep the serial order
+class FriendOfFriendCounts:
+  def __init__(self, keys: np.ndarray, counts: np.ndarray, firstSeen: np.ndarray, numberOfNodes: int) -> None:
+    self.keys = keys
+    self.counts = counts
+    self.firstSeen = firstSeen
+    self.numberOfNodes = numberOfNodes
+
+  def pairs(self, selected: np.ndarray) -> list[tuple]:
+    keys = self.keys[selected]
+    return list(zip((keys // self.numberOfNodes).tolist(), (keys % self.numberOfNodes).tolist()))
+
+def emptyCounts(numberOfNodes: int) -> FriendOfFriendCounts:
+  empty = np.zeros(0, dtype=np.int64)
+  return FriendOfFriendCounts(empty, empty, empty, numberOfNodes)
+
+# pairWorkload returns, for every stored edge entry p of a row ending at e, the number of
+# entries after it (the e - p - 1 partners it is paired with, as in itertools.combinations)
+# and the number of pairs enumerated before it
+def pairWorkload(csrGraph: CSRGraph) -> tuple[np.ndarray, np.ndarray]:
+  rowEnds = np.repeat(csrGraph.offsets[1:], csrGraph.degrees())
+  partnersAfter = rowEnds - np.arange(len(csrGraph.indices), dtype=np.int64) - 1
+  pairsBefore = np.concatenate(([0], np.cumsum(partnersAfter)))
+  return partnersAfter, pairsBefore
+
+# countPairsFrom counts the pairs whose first friend sits at one of the given entry positions,
+# in chunks of at most pairsPerChunk pairs
+# Time complexity: O(P log P) with P the number of pairs enumerated
+# Space complexity: O(number of distinct non-friend pairs + pairsPerChunk)
+def countPairsFrom(csrGraph: CSRGraph, positions: np.ndarray, partnersAfter: np.ndarray, pairsBefore: np.ndarray, pairsPerChunk: int) -> FriendOfFriendCounts:
+  numberOfNodes = csrGraph.numberOfNodes()
+  partners = partnersAfter[positions]
+  cumulativePairs = np.concatenate(([0], np.cumsum(partners)))
+  chunkKeys, chunkCounts, chunkFirstSeen = [], [], []
+  start = 0
+  while start < len(positions):
+    end = int(np.searchsorted(cumulativePairs, cumulativePairs[start] + pairsPerChunk, side='right')) - 1
+    end = max(end, start + 1)
+    chunkPartners = partners[start:end]
+    numberOfPairs = int(cumulativePairs[end] - cumulativePairs[start])
+    if numberOfPairs > 0:
+      firstPositions = np.repeat(positions[start:end], chunkPartners)
+      steps = np.arange(1, numberOfPairs + 1, dtype=np.int64) - np.repeat(np.cumsum(chunkPartners) - chunkPartners, chunkPartners)
+      secondPositions = firstPositions + steps
+      firstFriends = csrGraph.indices[firstPositions]
+      secondFriends = csrGraph.indices[secondPositions]
+      notFriends = ~csrGraph.hasEdges(firstFriends, secondFriends)
+      keys = firstFriends[notFriends].astype(np.int64) * numberOfNodes + secondFriends[notFriends]
+      order = (pairsBefore[firstPositions] + steps - 1)[notFriends]
+      keys, firstIndex, counts = np.unique(keys, return_index=True, return_counts=True)
+      chunkKeys.append(keys)
+      chunkCounts.append(counts)
+      chunkFirstSeen.append(order[firstIndex])
+    start = end
+
+  if not chunkKeys:
+    return emptyCounts(numberOfNodes)
+  return mergeCounts(chunkKeys, chunkCounts, chunkFirstSeen, numberOfNodes)
+
+# countFriendOfFriendPairs is the batched replacement for the per-node combinations loop
+def countFriendOfFriendPairs(csrGraph: CSRGraph, pairsPerChunk: int = PAIRS_PER_CHUNK) -> FriendOfFriendCounts:
+  partnersAfter, pairsBefore = pairWorkload(csrGraph)
+  positions = np.arange(len(csrGraph.indices), dtype=np.int64)
+  return countPairsFrom(csrGraph, positions, partnersAfter, pairsBefore, pairsPerChunk)
+
+# mergeCounts adds up the counts of the same pair found in different chunks
+# and keeps the earliest position it was seen at
+def mergeCounts(chunkKeys: list, chunkCounts: list, chunkFirstSeen: list, numberOfNodes: int) -> FriendOfFriendCounts:
+  keys = np.concatenate(chunkKeys)
+  counts = np.concatenate(chunkCounts)
+  firstSeen = np.concatenate(chunkFirstSeen)
+  if len(chunkKeys) > 1 and len(keys) > 0:
+    order = np.argsort(keys, kind='stable')
+    keys, counts, firstSeen = keys[order], counts[order], firstSeen[order]
+    groupStarts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    keys = keys[groupStarts]
+    counts = np.add.reduceat(counts, groupStarts)
+    firstSeen = np.minimum.reduceat(firstSeen, groupStarts)
+  return FriendOfFriendCounts(keys, counts, firstSeen, numberOfNodes)
+
+def kthLargestCount(counts: np.ndarray, topK: int) -> int:
+  return counts[np.argpartition(counts, len(counts) - topK)[len(counts) - topK]]
+
+# topCandidates keeps every pair whose count ties or beats the k-th largest count
+def topCandidates(friendOfFriendCounts: FriendOfFriendCounts, topK: int) -> np.ndarray:
+  counts = friendOfFriendCounts.counts
+  if len(counts) < topK:
+    return np.arange(len(counts))
+  return np.flatnonzero(counts >= kthLargestCount(counts, topK))
+
+# selectTopPairs keeps the pairs whose count is strictly greater than the k-th largest count,
+# found with argpartition instead of sorting every count, ordered by when they were first seen
+def selectTopPairs(friendOfFriendCounts: FriendOfFriendCounts, topK: int) -> list[tuple]:
+  counts = friendOfFriendCounts.counts
+  if len(counts) < topK:
+    selected = np.arange(len(counts))
+  else:
+    selected = np.flatnonzero(counts > kthLargestCount(counts, topK))
+  selected = selected[np.argsort(friendOfFriendCounts.firstSeen[selected], kind='stable')]
+  return friendOfFriendCounts.pairs(selected)
+
+# countShard counts every pair whose first friend is in [firstNode, lastNode).
+# Those pairs belong to this shard only, so its local top-k candidates are exact
+def countShard(firstNode: int, lastNode: int, directed: bool, topK: int, pairsPerChunk: int) -> tuple:
+  arrays = workerArrays
+  transposedOffsets = arrays['transposedOffsets']
+  positions = arrays['transposedPositions'][transposedOffsets[firstNode]:transposedOffsets[lastNode]]
+  friendOfFriendCounts = countPairsFrom(CSRGraph.fromSharedArrays(arrays, directed), positions, arrays['partnersAfter'], arrays['pairsBefore'], pairsPerChunk)
+  selected = topCandidates(friendOfFriendCounts, topK)
+  return friendOfFriendCounts.keys[selected], friendOfFriendCounts.counts[selected], friendOfFriendCounts.firstSeen[selected]
+
+# shardBoundaries splits the nodes into contiguous ranges with about the same number of pairs
+def shardBoundaries(pairsPerNode: np.ndarray, numberOfShards: int) -> list[tuple]:
+  cumulativePairs = np.cumsum(pairsPerNode)
+  totalPairs = cumulativePairs[-1] if len(cumulativePairs) else 0
+  targets = totalPairs * np.arange(1, numberOfShards) / numberOfShards
+  cuts = [0] + np.searchsorted(cumulativePairs, targets, side='right').tolist() + [len(pairsPerNode)]
+  return [(first, last) for first, last in zip(cuts, cuts[1:]) if last > first]
+
+# countFriendOfFriendPairsParallel shards the pairs by their first friend across a process pool.
+# Workers map the adjacency from shared memory and return only their local top-k candidates,
+# which are merged here. The result is the same as the serial kernel for the top-k selection
+def countFriendOfFriendPairsParallel(csrGraph: CSRGraph, topK: int, workers: int, pairsPerChunk: int = PAIRS_PER_CHUNK) -> FriendOfFriendCounts:
+  numberOfNodes = csrGraph.numberOfNodes()
+  if len(csrGraph.indices) == 0:
+    return emptyCounts(numberOfNodes)
+
+  partnersAfter, pairsBefore = pairWorkload(csrGraph)
+  # Entry positions grouped by the node they point at, so a shard finds
+  # the positions of its first friends without scanning the whole graph
+  transposedPositions = np.argsort(csrGraph.indices, kind='stable')
+  transposedOffsets = np.concatenate(([0], np.cumsum(np.bincount(csrGraph.indices, minlength=numberOfNodes))))
+  pairsPerNode = np.bincount(csrGraph.indices, weights=partnersAfter, minlength=numberOfNodes)
+  arrays = csrGraph.sharedArrays()
+  arrays.update(partnersAfter=partnersAfter, pairsBefore=pairsBefore, transposedPositions=transposedPositions, transposedOffsets=transposedOffsets)
+
+  with SharedArrays(arrays) as sharedArrays:
+    with ProcessPoolExecutor(max_workers=workers, initializer=attachWorker, initargs=(sharedArrays.descriptors,)) as executor:
+      futures = [executor.submit(countShard, firstNode, lastNode, csrGraph.directed, topK, pairsPerChunk)
+                 for firstNode, lastNode in shardBoundaries(pairsPerNode, workers * SHARDS_PER_WORKER)]
+      shards = [future.result() for future in futures]
+
+  return mergeCounts([keys for keys, _, _ in shards], [counts for _, counts, _ in shards], [firstSeen for _, _, firstSeen in shards], numberOfNodes)
+
+# FriendOfFriendIndex is a persistent friend-of-friend table for streaming edge changes.
+# It holds the same counts as countFriendOfFriendPairs (ordered pairs by adjacency position,
+# friends left out) keyed by original node ids, in buckets keyed by count, so that when an
+# edge (u, v) arrives or leaves only the pairs through u and v change, and the live top-k view
+# is read from the highest buckets instead of recounting the graph.
+# Time complexity: O(deg(u) + deg(v)) per edge change
+class FriendOfFriendIndex:
+  def __init__(self, graph, csrGraph: CSRGraph) -> None:
+    self.graph = graph
+    self.directed = csrGraph.directed
+    self.counts = {}
+    self.buckets = {}
+    self.maxCount = 0
+    friendOfFriendCounts = countFriendOfFriendPairs(csrGraph)
+    order = np.argsort(friendOfFriendCounts.firstSeen, kind='stable')
+    nodes = csrGraph.nodes
+    pairs = friendOfFriendCounts.pairs(order)
+    for (first, second), count in zip(pairs, friendOfFriendCounts.counts[order].tolist()):
+      self.setCount((nodes[first], nodes[second]), count)
+
+  def setCount(self, pair: tuple, count: int) -> None:
+    oldCount = self.counts.pop(pair, 0)
+    if oldCount:
+      bucket = self.buckets[oldCount]
+      del bucket[pair]
+      if not bucket:
+        del self.buckets[oldCount]
+    if count:
+      self.counts[pair] = count
+      self.buckets.setdefault(count, {})[pair] = None
+    if count > self.maxCount:
+      self.maxCount = count
+    while self.maxCount and self.maxCount not in self.buckets:
+      self.maxCount -= 1
+
+  # addCount changes the count of a pair that is not already friends
+  def addCount(self, first, second, delta: int) -> None:
+    if first != second and not self.graph.has_edge(first, second):
+      self.setCount((first, second), self.counts.get((first, second), 0) + delta)
+
+  # pairCount counts the common friends that list first before second, used when two friends
+  # stop being friends and their pair comes back into the table
+  def pairCount(self, first, second) -> int:
+    graph = self.graph
+    commonFriends = set(graph.pred[first]) & set(graph.pred[second]) if self.directed else set(graph.adj[first]) & set(graph.adj[second])
+    count = 0
+    for commonFriend in commonFriends:
+      for neighbor in graph.adj[commonFriend]:
+        if neighbor == first or neighbor == second:
+          count += neighbor == first
+          break
+    return count
+
+  # edgeAdded is called after the edge (u, v) was added to the graph. networkx appends v to the
+  # neighbours of u (and u to those of v), so v forms a new pair with every earlier neighbour of u
+  def edgeAdded(self, firstVertex, secondVertex) -> None:
+    self.setCount((firstVertex, secondVertex), 0)
+    endpoints = [(firstVertex, secondVertex)]
+    if not self.directed:
+      self.setCount((secondVertex, firstVertex), 0)
+      if firstVertex != secondVertex:
+        endpoints.append((secondVertex, firstVertex))
+    for commonFriend, newFriend in endpoints:
+      for neighbor in self.graph.adj[commonFriend]:
+        if neighbor != newFriend:
+          self.addCount(neighbor, newFriend, 1)
+
+  # edgeRemoving is called before the edge (u, v) is removed: v leaves the pairs it formed with
+  # the neighbours of u listed before it (v second) and after it (v first)
+  def edgeRemoving(self, firstVertex, secondVertex) -> None:
+    endpoints = [(firstVertex, secondVertex)]
+    if not self.directed and firstVertex != secondVertex:
+      endpoints.append((secondVertex, firstVertex))
+    for commonFriend, oldFriend in endpoints:
+      isBefore = True
+      for neighbor in self.graph.adj[commonFriend]:
+        if neighbor == oldFriend:
+          isBefore = False
+        elif isBefore:
+          self.addCount(neighbor, oldFriend, -1)
+        else:
+          self.addCount(oldFriend, neighbor, -1)
+
+  # edgeRemoved is called after the edge (u, v) was removed: u and v are no longer friends,
+  # so their own pairs come back into the table
+  def edgeRemoved(self, firstVertex, secondVertex) -> None:
+    if firstVertex == secondVertex:
+      return
+    pairs = [(firstVertex, secondVertex)] if self.directed else [(firstVertex, secondVertex), (secondVertex, firstVertex)]
+    for first, second in pairs:
+      if not self.graph.has_edge(first, second):
+        self.setCount((first, second), self.pairCount(first, second))
+
+  # topPairs returns the pairs whose count is strictly greater than the k-th largest count,
+  # highest counts first, walking the buckets down from the top
+  # Time complexity: O(number of buckets walked + pairs returned)
+  def topPairs(self, topK: int) -> list[tuple]:
+    if len(self.counts) < topK:
+      return [pair for count in sorted(self.buckets, reverse=True) for pair in self.buckets[count]]
+
+    topPairs, numberOfPairs = [], 0
+    for count in range(self.maxCount, 0, -1):
+      bucket = self.buckets.get(count)
+      if not bucket:
+        continue
+      numberOfPairs += len(bucket)
+      # This bucket holds the k-th largest count
+      if numberOfPairs >= topK:
+        return topPairs
+      topPairs.extend(bucket)
+    return topPairs
@@ -0,0 +1,150 @@
+import atexit
+import matplotlib
+import numpy as np
+import networkx as nx
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from csr_graph import CSRGraph
+from degree_index import networkxDegrees
+
+# Graphs with more nodes than this are drawn from a level of detail sample,
+# since the spring layout and the drawing of thousands of nodes take minutes
+DRAW_MAX_NODES = 500
+# How long an interactive plot stays on screen before the analysis continues
+INTERACTIVE_PAUSE = 5
+
+# kCoreMask peels every node with fewer than k neighbours (ignoring self loops) until none is left,
+# one vectorized pass over the edges per round. For directed graphs in + out degree is used
+# Time complexity: O(rounds * (V + E))
+def kCoreMask(csrGraph: CSRGraph, k: int) -> np.ndarray:
+  numberOfNodes = csrGraph.numberOfNodes()
+  sources, targets = csrGraph.rowIds().astype(np.int64), csrGraph.indices.astype(np.int64)
+  notLoop = sources != targets
+  sources, targets = sources[notLoop], targets[notLoop]
+  alive = np.ones(numberOfNodes, dtype=bool)
+  while True:
+    kept = alive[sources] & alive[targets]
+    degrees = np.bincount(sources[kept], minlength=numberOfNodes)
+    if csrGraph.directed:
+      degrees += np.bincount(targets[kept], minlength=numberOfNodes)
+    stillAlive = alive & (degrees >= k)
+    if np.array_equal(stillAlive, alive):
+      return alive
+    alive = stillAlive
+
+# densestCoreWithin returns the k-core with the smallest k that fits in maxNodes nodes.
+# Core sizes only shrink as k grows, so k is found with a binary search
+def densestCoreWithin(csrGraph: CSRGraph, maxNodes: int) -> np.ndarray:
+  low, high = 0, int(networkxDegrees(csrGraph).max(initial=0)) + 1
+  while low < high:
+    k = (low + high) // 2
+    if np.count_nonzero(kCoreMask(csrGraph, k)) <= maxNodes:
+      high = k
+    else:
+      low = k + 1
+  return kCoreMask(csrGraph, low)
+
+# levelOfDetail picks at most maxNodes contiguous ids to draw: the nodes with the highest degree
+# ('degree'), or the densest k-core that fits topped up by degree ('core'). Pinned nodes are always kept.
+# The ids are returned in their original order
+def levelOfDetail(csrGraph: CSRGraph, maxNodes: int = DRAW_MAX_NODES, detail: str = 'degree', pinned: np.ndarray = None) -> np.ndarray:
+  numberOfNodes = csrGraph.numberOfNodes()
+  if numberOfNodes <= maxNodes:
+    return np.arange(numberOfNodes)
+  priority = networkxDegrees(csrGraph).astype(np.float64)
+  if detail == 'core':
+    priority[densestCoreWithin(csrGraph, maxNodes)] += priority.max() + 1
+  elif detail != 'degree':
+    raise ValueError(f"Unknown level of detail {detail}, expected 'degree' or 'core'")
+  if pinned is not None:
+    priority[pinned] = np.inf
+  return np.sort(np.argsort(-priority, kind='stable')[:maxNodes])
+
+# drawingData is the picklable part of a subgraph a drawing needs:
+# the node labels and the edges as positions in that label list
+def drawingData(csrGraph: CSRGraph, keep: np.ndarray) -> tuple[list, list, list]:
+  subgraph = csrGraph.subgraph(keep)
+  return subgraph.nodes, subgraph.rowIds().tolist(), subgraph.indices.tolist()
+
+# degreeCentralityHistogram counts the nodes per degree with a bincount and returns the
+# degree centrality of every degree that occurs with its number of nodes, which plots
+# the same histogram as the list of degree_centrality values
+def degreeCentralityHistogram(csrGraph: CSRGraph) -> tuple[np.ndarray, np.ndarray]:
+  numberOfNodes = csrGraph.numberOfNodes()
+  counts = np.bincount(networkxDegrees(csrGraph))
+  degrees = np.flatnonzero(counts)
+  scale = 1.0 / (numberOfNodes - 1.0) if numberOfNodes > 1 else 1.0
+  return degrees * scale, counts[degrees]
+
+# Figures are built from plain lists and arrays, so the same code draws on screen
+# and in the rendering process
+def networkFigure(title: str, labels: list, sources: list, targets: list, directed: bool, withLabels: bool = True, seed: int = 0):
+  import matplotlib.pyplot as plt
+  graph = nx.DiGraph() if directed else nx.Graph()
+  graph.add_nodes_from(range(len(labels)))
+  graph.add_edges_from(zip(sources, targets))
+  figure = plt.figure(figsize=(8, 8))
+  plt.title(label=title)
+  nx.draw(graph, nx.spring_layout(graph, seed=seed), labels=dict(enumerate(labels)) if withLabels else None, with_labels=withLabels)
+  return figure
+
+def histogramFigure(title: str, values: np.ndarray, weights: np.ndarray):
+  import matplotlib.pyplot as plt
+  figure = plt.figure(figsize=(8, 8))
+  plt.title(label=title)
+  plt.hist(values, weights=weights)
+  return figure
+
+# renderFigure runs in the rendering process: it draws with the headless Agg backend
+# and writes the file in the format of its suffix (png, svg, pdf, ...)
+def renderFigure(figureFunction, outputPath: str, arguments: tuple) -> str:
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  figure = figureFunction(*arguments)
+  Path(outputPath).parent.mkdir(parents=True, exist_ok=True)
+  figure.savefig(outputPath)
+  plt.close(figure)
+  return str(outputPath)
+
+# The rendering process, started on the first headless drawing. Spawned rather than forked,
+# so it does not inherit the caller's matplotlib state or threads
+renderingExecutor = None
+pendingRenders = []
+
+def startRenderingProcess() -> ProcessPoolExecutor:
+  return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+
+def submitRender(figureFunction, outputPath: str, arguments: tuple) -> Future:
+  global renderingExecutor
+  if renderingExecutor is None:
+    renderingExecutor = startRenderingProcess()
+    atexit.register(waitForRenders)
+  try:
+    future = renderingExecutor.submit(renderFigure, figureFunction, str(outputPath), arguments)
+  except BrokenProcessPool:
+    # The rendering process died; only the drawings it held are lost, later ones get a new process
+    renderingExecutor.shutdown(wait=False)
+    renderingExecutor = startRenderingProcess()
+    future = renderingExecutor.submit(renderFigure, figureFunction, str(outputPath), arguments)
+  pendingRenders.append(future)
+  return future
+
+# waitForRenders blocks until every submitted drawing is written and returns their paths.
+# A failed drawing raises its error once, it is not waited for again
+def waitForRenders() -> list[str]:
+  futures = pendingRenders[:]
+  pendingRenders.clear()
+  return [future.result() for future in futures]
+
+# draw writes the figure from the rendering process when an output path is given and returns
+# its future right away, otherwise shows it on screen for INTERACTIVE_PAUSE seconds
+def draw(figureFunction, outputPath: str, *arguments) -> Future:
+  if outputPath is not None:
+    return submitRender(figureFunction, outputPath, arguments)
+  import matplotlib.pyplot as plt
+  figureFunction(*arguments)
+  plt.show(block=False)
+  plt.pause(INTERACTIVE_PAUSE)
+  return None
@@ -0,0 +1,71 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+import networkx as nx
+from pathlib import Path
+from csr_graph import CSRGraph
+from social_net import SocialNetwork
+from concurrent.futures.process import BrokenProcessPool
+from rendering import kCoreMask, levelOfDetail, degreeCentralityHistogram, histogramFigure, submitRender, waitForRenders
+
+class TestRendering(unittest.TestCase):
+  def test_KCoreMatchesNetworkx(self):
+    graph = nx.barabasi_albert_graph(400, 3, seed=2)
+    graph.add_edge(5, 5)
+    csrGraph = CSRGraph.fromNetworkx(graph)
+    graph.remove_edges_from(nx.selfloop_edges(graph))
+    for k in range(1, 6):
+      expected = set(nx.k_core(graph, k))
+      self.assertEqual(expected, {csrGraph.nodes[i] for i in np.flatnonzero(kCoreMask(csrGraph, k))})
+
+  def test_LevelOfDetailKeepsTheBestConnectedUsers(self):
+    graph = nx.barabasi_albert_graph(1000, 2, seed=3)
+    csrGraph = CSRGraph.fromNetworkx(graph)
+    self.assertEqual(list(range(1000)), levelOfDetail(csrGraph, 1000).tolist())
+
+    keep = levelOfDetail(csrGraph, 50)
+    self.assertEqual(50, len(keep))
+    degrees = dict(graph.degree())
+    self.assertGreaterEqual(min(degrees[node] for node in keep), max(degrees[node] for node in set(graph) - set(keep.tolist())))
+
+    coreKeep = levelOfDetail(csrGraph, 50, detail='core', pinned=np.array([999]))
+    self.assertEqual(50, len(coreKeep))
+    self.assertIn(999, coreKeep)
+    self.assertRaises(ValueError, levelOfDetail, csrGraph, 50, 'random')
+
+  def test_DegreeHistogramMatchesDegreeCentrality(self):
+    graph = nx.gnm_random_graph(300, 900, seed=4, directed=True)
+    values, weights = degreeCentralityHistogram(CSRGraph.fromNetworkx(graph))
+    expectedCounts, expectedEdges = np.histogram(list(nx.degree_centrality(graph).values()))
+    counts, edges = np.histogram(values, weights=weights)
+    self.assertEqual(expectedCounts.tolist(), counts.tolist())
+    self.assertTrue(np.allclose(expectedEdges, edges))
+
+  def test_HeadlessDrawingsAreWrittenInTheBackground(self):
+    sn = SocialNetwork(nx.barabasi_albert_graph(2000, 3, seed=5))
+    with tempfile.TemporaryDirectory() as tempDir:
+      networkPath = Path(tempDir) / 'network.svg'
+      histogramPath = Path(tempDir) / 'plots' / 'degrees.png'
+      networkFuture = sn.drawGraph(outputPath=networkPath, maxNodes=100)
+      histogramFuture = sn.drawGraph(degreeDistribution=True, outputPath=histogramPath)
+      sn.findLargestCommunities(outputPath=Path(tempDir) / 'clique.png', maxNodes=100)
+      self.assertEqual(3, len(waitForRenders()))
+      self.assertEqual(str(networkPath), networkFuture.result())
+      self.assertEqual(str(histogramPath), histogramFuture.result())
+      self.assertTrue(networkPath.read_text().lstrip().startswith('<?xml'))
+      self.assertEqual(b'\x89PNG', histogramPath.read_bytes()[:4])
+      self.assertTrue((Path(tempDir) / 'clique.png').exists())
+
+  def test_RenderingProcessIsRestartedAfterItDies(self):
+    with tempfile.TemporaryDirectory() as tempDir:
+      # Exiting from the figure function kills the rendering process
+      crashed = submitRender(os._exit, Path(tempDir) / 'crash.png', (1,))
+      self.assertRaises(BrokenProcessPool, crashed.result)
+      self.assertRaises(BrokenProcessPool, waitForRenders)
+      histogramPath = Path(tempDir) / 'degrees.png'
+      submitRender(histogramFigure, histogramPath, ('Degrees', [0.1, 0.2], [1, 1]))
+      self.assertEqual([str(histogramPath)], waitForRenders())
+
+if __name__ == '__main__':
+  unittest.main()
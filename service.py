@@ -0,0 +1,228 @@
+import json
+import time
+import asyncio
+import argparse
+import traceback
+import networkx as nx
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from social_net import SocialNetwork
+from graph_store import isStore, loadGraph, openStore
+
+# The query service keeps one SocialNetwork loaded and answers JSON lines over a local socket:
+#   request   {"id": 1, "method": "distance", "params": {"source": "u1", "target": "u2"}}
+#   response  {"id": 1, "result": 3}  or  {"id": 1, "error": {"type": "NetworkXError", "message": "..."}}
+# Queries run on one worker thread, so the event loop keeps accepting requests while a heavy one
+# runs and the network (whose indexes are built lazily) is never used by two threads at once.
+# Results are cached per graph version, and identical requests in flight share one computation
+DEFAULT_PORT = 8765
+CACHE_SIZE = 1024
+# Seconds a cached result is served before it is computed again
+CACHE_TTL = 300.0
+# Longest request line in bytes, large enough for a batched distances request of millions of pairs
+LINE_LIMIT = 64 << 20
+
+# Read only queries, called with the request params as keyword arguments
+QUERIES = {
+  'findImportantPeople': lambda sn: sn.findImportantPeople(),
+  'findTopPeople': lambda sn, topK=10: sn.findTopPeople(topK),
+  'distance': lambda sn, source, target: sn.getDistanceWithCurrentNode(source, target),
+  'distances': lambda sn, pairs, exact=True: sn.getDistances([tuple(pair) for pair in pairs], exact),
+  'shortestPath': lambda sn, source, target: sn.getShortestPath(source, target),
+  'pathExist': lambda sn, source, target: sn.pathExist(source, target),
+  'recommendedFriends': lambda sn, topK=10: sn.recommendedFriends(topK),
+  'largestCommunities': lambda sn, k=2, method='labelPropagation', timeBudget=None, seed=0: sn.largestCommunities(k, method, timeBudget, seed),
+  'communitySizes': lambda sn, limit=10, seed=0: sn.detectCommunities(seed).sizes[:limit].tolist(),
+  'communityOf': lambda sn, users, seed=0: communityOf(sn, users, seed),
+  'findInfluencers': lambda sn, topK=10, method='pagerank', filters=None: sn.findInfluencers(topK, method, **(filters or {})),
+}
+
+# Queries that change the graph. They drop the cached results
+MUTATIONS = {
+  'addEdge': lambda sn, source, target, attributes=None: sn.addEdge(source, target, **(attributes or {})),
+  'removeEdge': lambda sn, source, target: sn.removeEdge(source, target),
+  'addEdges': lambda sn, edges: sn.addEdges(tuple(edge) for edge in edges),
+  'removeEdges': lambda sn, edges: sn.removeEdges(tuple(edge) for edge in edges),
+}
+
+def communityOf(sn: SocialNetwork, users: list, seed: int) -> list[int]:
+  membership = sn.detectCommunities(seed).membership
+  return [int(membership[sn.csrGraph.indexOf(user)]) for user in users]
+
+# ResultCache is a least recently used cache whose entries also expire ttl seconds after they were stored
+class ResultCache:
+  def __init__(self, maxSize: int = CACHE_SIZE, ttl: float = CACHE_TTL, clock=time.monotonic) -> None:
+    self.maxSize = maxSize
+    self.ttl = ttl
+    self.clock = clock
+    # key -> (expiry time, result), least recently used first
+    self.entries = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self.entries)
+
+  # get returns the cached result, or default when there is none or it expired
+  def get(self, key, default=None):
+    entry = self.entries.get(key)
+    if entry is None:
+      return default
+    expiry, result = entry
+    if self.clock() >= expiry:
+      del self.entries[key]
+      return default
+    self.entries.move_to_end(key)
+    return result
+
+  def put(self, key, result) -> None:
+    self.entries[key] = (self.clock() + self.ttl, result)
+    self.entries.move_to_end(key)
+    while len(self.entries) > self.maxSize:
+      self.entries.popitem(last=False)
+
+  def clear(self) -> None:
+    self.entries.clear()
+
+# Marks a cache miss, since None is a valid result
+MISSING = object()
+
+def errorResponse(requestId, error: Exception) -> dict:
+  return {'id': requestId, 'error': {'type': type(error).__name__, 'message': str(error)}}
+
+class SocialNetworkService:
+  def __init__(self, sn: SocialNetwork, cacheSize: int = CACHE_SIZE, ttl: float = CACHE_TTL) -> None:
+    self.sn = sn
+    self.cache = ResultCache(cacheSize, ttl)
+    # Cache key -> future of the computation in progress
+    self.inFlight = {}
+    self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='social-net-query')
+    self.stats = {'requests': 0, 'cacheHits': 0, 'coalesced': 0, 'computed': 0, 'mutations': 0, 'errors': 0}
+
+  # call answers one query: from the cache, by joining an identical query in flight,
+  # or by running it on the worker thread
+  async def call(self, method: str, params: dict = None):
+    params = params or {}
+    loop = asyncio.get_running_loop()
+    if method in MUTATIONS:
+      self.stats['mutations'] += 1
+      result = await loop.run_in_executor(self.executor, lambda: MUTATIONS[method](self.sn, **params))
+      # Keys carry the graph version, so stale entries could never be hit again; drop them to free memory
+      self.cache.clear()
+      return result
+    if method == 'stats':
+      return dict(self.stats, cachedResults=len(self.cache), version=self.sn.version)
+    if method not in QUERIES:
+      raise ValueError(f"Unknown method {method}")
+
+    key = (self.sn.version, method, json.dumps(params, sort_keys=True))
+    result = self.cache.get(key, MISSING)
+    if result is not MISSING:
+      self.stats['cacheHits'] += 1
+      return result
+    if key in self.inFlight:
+      self.stats['coalesced'] += 1
+      return await asyncio.shield(self.inFlight[key])
+
+    self.stats['computed'] += 1
+    future = loop.run_in_executor(self.executor, lambda: QUERIES[method](self.sn, **params))
+    self.inFlight[key] = future
+    try:
+      # A client that goes away does not cancel the computation the others are waiting for
+      result = await asyncio.shield(future)
+    finally:
+      del self.inFlight[key]
+    self.cache.put(key, result)
+    return result
+
+  # handle turns one request into its response, reporting failures instead of raising them
+  async def handle(self, request: dict) -> dict:
+    self.stats['requests'] += 1
+    try:
+      return {'id': request.get('id'), 'result': await self.call(request['method'], request.get('params'))}
+    except (KeyError, TypeError, ValueError, nx.NetworkXException) as error:
+      self.stats['errors'] += 1
+      return errorResponse(request.get('id'), error)
+    except Exception as error:
+      # Unexpected failures are answered too, so that every request id gets a reply
+      traceback.print_exc()
+      self.stats['errors'] += 1
+      return errorResponse(request.get('id'), error)
+
+  # serveClient answers the requests of one connection concurrently, one JSON object per line,
+  # so responses may come back in another order than the requests; the id pairs them up.
+  # A line longer than the limit is answered with an error and skipped, the connection stays usable
+  async def serveClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    tasks = set()
+
+    async def send(response: dict) -> None:
+      writer.write(json.dumps(response, default=str).encode() + b'\n')
+      await writer.drain()
+
+    async def respond(line: bytes) -> None:
+      try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+          raise ValueError("A request must be a JSON object")
+      except ValueError as error:
+        await send(errorResponse(None, error))
+        return
+      await send(await self.handle(request))
+
+    def spawn(coroutine) -> None:
+      task = asyncio.create_task(coroutine)
+      tasks.add(task)
+      task.add_done_callback(tasks.discard)
+
+    overlong = False
+    try:
+      while True:
+        try:
+          line = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as error:
+          # The last line may have no newline, it is empty at the end of the stream
+          line = error.partial
+        except asyncio.LimitOverrunError as error:
+          # Drop what is buffered of the line, its rest is dropped with the next read
+          await reader.readexactly(error.consumed)
+          overlong = True
+          continue
+        if overlong:
+          overlong = False
+          spawn(send(errorResponse(None, ValueError("Request line is longer than the line limit"))))
+        elif line.strip():
+          spawn(respond(line))
+        if not line.endswith(b'\n'):
+          break
+      await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+      writer.close()
+
+  async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, lineLimit: int = LINE_LIMIT) -> asyncio.Server:
+    return await asyncio.start_server(self.serveClient, host, port, limit=lineLimit)
+
+  def close(self) -> None:
+    self.executor.shutdown(wait=True)
+
+# loadNetwork opens a graph store directly, or the store next to a pickled dump
+def loadNetwork(graphPath: Path) -> SocialNetwork:
+  if isStore(graphPath):
+    return SocialNetwork(csrGraph=loadGraph(graphPath))
+  return SocialNetwork(csrGraph=openStore(graphPath))
+
+async def serve(graphPath: Path, host: str, port: int) -> None:
+  service = SocialNetworkService(loadNetwork(graphPath))
+  server = await service.start(host, port)
+  print(f'Serving {graphPath} on {host}:{port}', flush=True)
+  try:
+    async with server:
+      await server.serve_forever()
+  finally:
+    service.close()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Answer SocialNetwork queries as JSON lines over a local socket")
+  parser.add_argument('graph', type=Path, nargs='?', default=Path('data/github_users.p'), help="a pickled dump or a graph store")
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+  args = parser.parse_args()
+  asyncio.run(serve(args.graph, args.host, args.port))
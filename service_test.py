@@ -0,0 +1,140 @@
+import json
+import asyncio
+import threading
+import unittest
+import networkx as nx
+from unittest import mock
+import service
+from social_net import SocialNetwork
+from service import ResultCache, SocialNetworkService
+
+class TestResultCache(unittest.TestCase):
+  def test_LeastRecentlyUsedAndExpiry(self):
+    now = [0.0]
+    cache = ResultCache(maxSize=2, ttl=10, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', None)
+    self.assertEqual(1, cache.get('a'))
+    cache.put('c', 3)
+    # 'b' was used least recently
+    self.assertEqual('missing', cache.get('b', 'missing'))
+    self.assertEqual(1, cache.get('a'))
+    now[0] = 10.0
+    self.assertIsNone(cache.get('c'))
+    self.assertIsNone(cache.get('a'))
+    self.assertEqual(0, len(cache))
+
+class TestSocialNetworkService(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self):
+    self.service = SocialNetworkService(SocialNetwork(nx.path_graph(20), instrument=False))
+
+  async def asyncTearDown(self):
+    self.service.close()
+
+  async def test_RepeatedQueriesAreCacheHits(self):
+    first = await self.service.call('findImportantPeople')
+    second = await self.service.call('findImportantPeople')
+    self.assertEqual(first, second)
+    self.assertEqual(1, self.service.stats['computed'])
+    self.assertEqual(1, self.service.stats['cacheHits'])
+    # Other params are another query
+    self.assertEqual(19, await self.service.call('distance', {'source': 0, 'target': 19}))
+    self.assertEqual(2, self.service.stats['computed'])
+
+  async def test_IdenticalConcurrentQueriesAreCoalesced(self):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    def slowQuery(sn, value):
+      calls.append(value)
+      started.set()
+      release.wait(5)
+      return value * 2
+
+    with mock.patch.dict(service.QUERIES, {'slow': slowQuery}):
+      requests = [asyncio.create_task(self.service.call('slow', {'value': 21})) for _ in range(5)]
+      await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+      release.set()
+      self.assertEqual([42] * 5, await asyncio.gather(*requests))
+    self.assertEqual([21], calls)
+    self.assertEqual(4, self.service.stats['coalesced'])
+
+  async def test_MutationsInvalidateCachedResults(self):
+    self.assertEqual(19, await self.service.call('distance', {'source': 0, 'target': 19}))
+    await self.service.call('addEdge', {'source': 0, 'target': 19})
+    self.assertEqual(0, len(self.service.cache))
+    self.assertEqual(1, await self.service.call('distance', {'source': 0, 'target': 19}))
+    await self.service.call('removeEdges', {'edges': [[0, 19], [9, 10]]})
+    self.assertEqual(-1, await self.service.call('distance', {'source': 0, 'target': 19}))
+    self.assertEqual(3, (await self.service.call('stats'))['version'])
+
+  async def test_JsonLinesOverSocket(self):
+    server = await self.service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+      reader, writer = await asyncio.open_connection('127.0.0.1', port)
+      requests = [
+        {'id': 1, 'method': 'shortestPath', 'params': {'source': 2, 'target': 5}},
+        {'id': 2, 'method': 'distance', 'params': {'source': 0, 'target': 'nobody'}},
+        {'id': 3, 'method': 'unknown'},
+        {'id': 4, 'method': 'communitySizes', 'params': {'limit': 3}},
+      ]
+      for request in requests:
+        writer.write(json.dumps(request).encode() + b'\n')
+      writer.write(b'not json\n')
+      await writer.drain()
+      responses = [json.loads(await reader.readline()) for _ in range(5)]
+      writer.close()
+      await writer.wait_closed()
+
+    byId = {response['id']: response for response in responses}
+    self.assertEqual([2, 3, 4, 5], byId[1]['result'])
+    self.assertEqual('NetworkXError', byId[2]['error']['type'])
+    self.assertEqual('ValueError', byId[3]['error']['type'])
+    self.assertEqual(3, len(byId[4]['result']))
+    self.assertIn('JSONDecodeError', byId[None]['error']['type'])
+
+  async def test_EveryRequestIsAnswered(self):
+    def brokenQuery(sn):
+      raise RuntimeError("broken")
+
+    directedService = SocialNetworkService(SocialNetwork(nx.DiGraph([(0, 1), (1, 2)]), instrument=False))
+    self.addCleanup(directedService.close)
+    with mock.patch.dict(service.QUERIES, {'broken': brokenQuery}), mock.patch('traceback.print_exc'):
+      server = await directedService.start('127.0.0.1', 0, lineLimit=4096)
+      port = server.sockets[0].getsockname()[1]
+      async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        requests = [
+          {'id': 1, 'method': 'broken'},
+          {'id': 2, 'method': 'largestCommunities', 'params': {'method': 'clique'}},
+          {'id': 3, 'method': 'distances', 'params': {'pairs': [[0, 2]] * 1000}},
+          {'id': 4, 'method': 'distance', 'params': {'source': 0, 'target': 2}},
+        ]
+        for request in requests:
+          writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(4)]
+        writer.close()
+        await writer.wait_closed()
+
+    byId = {response['id']: response for response in responses}
+    self.assertEqual('RuntimeError', byId[1]['error']['type'])
+    self.assertEqual('NetworkXNotImplemented', byId[2]['error']['type'])
+    # The line over the limit is answered without an id, and the next one is still served
+    self.assertEqual('ValueError', byId[None]['error']['type'])
+    self.assertEqual(2, byId[4]['result'])
+
+  async def test_LargeBatchFitsTheDefaultLineLimit(self):
+    server = await self.service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+      reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=service.LINE_LIMIT)
+      writer.write(json.dumps({'id': 1, 'method': 'distances', 'params': {'pairs': [[0, 19]] * 20000}}).encode() + b'\n')
+      await writer.drain()
+      response = json.loads(await reader.readline())
+      writer.close()
+      await writer.wait_closed()
+    self.assertEqual([19] * 20000, response['result'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,57 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# SharedArrays publishes NumPy arrays in named shared memory blocks so that worker
+# processes can map the same pages instead of receiving a pickled copy each.
+# The descriptors are small (name, shape, dtype) tuples that are cheap to send to workers
+class SharedArrays:
+  def __init__(self, arrays: dict) -> None:
+    self.blocks = []
+    self.descriptors = {}
+    for name, array in arrays.items():
+      array = np.ascontiguousarray(array)
+      # Shared memory blocks can not be empty
+      block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+      np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+      self.blocks.append(block)
+      self.descriptors[name] = (block.name, array.shape, array.dtype.str)
+
+  def close(self) -> None:
+    for block in self.blocks:
+      block.close()
+      block.unlink()
+    self.blocks = []
+
+  def __enter__(self) -> 'SharedArrays':
+    return self
+
+  def __exit__(self, *exc) -> None:
+    self.close()
+
+# attachSharedArrays maps the blocks published by SharedArrays in a worker process.
+# The returned blocks must stay referenced for as long as the arrays are used
+def attachSharedArrays(descriptors: dict) -> tuple[dict, list]:
+  arrays, blocks = {}, []
+  for name, (blockName, shape, dtype) in descriptors.items():
+    block = attachBlock(blockName)
+    blocks.append(block)
+    arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+  return arrays, blocks
+
+# The arrays mapped by each worker process, set once by attachWorker
+workerArrays = {}
+workerBlocks = []
+
+# attachWorker is a process pool initializer mapping the shared arrays once per worker
+def attachWorker(descriptors: dict) -> None:
+  arrays, blocks = attachSharedArrays(descriptors)
+  workerArrays.update(arrays)
+  workerBlocks.extend(blocks)
+
+def attachBlock(blockName: str) -> shared_memory.SharedMemory:
+  try:
+    return shared_memory.SharedMemory(name=blockName, track=False)
+  except TypeError:
+    # Before Python 3.13 attaching also registers the block with the resource tracker.
+    # Workers share the owner's tracker, so this is a no-op and the owner's unlink still cleans up
+    return shared_memory.SharedMemory(name=blockName)
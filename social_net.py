@@ -1,60 +1,261 @@
-import pickle
+import numpy as np
 import networkx as nx
-import matplotlib.pyplot as plt
 from arcplot import *
 from collections import defaultdict
-from itertools import combinations
 from dataset import downloadDataset
+from csr_graph import CSRGraph
+from connectivity import ConnectivityIndex
+from degree_index import DegreeIndex
+from distance_oracle import DistanceOracle
+from graph_store import loadGraph, openStore
+from cliques import findTopKCliques
+from communities import Communities, labelPropagation
+from centrality import approximateBetweenness, hits, pageRank, pivotsForErrorBound
+from instrumentation import Instrumentation, instrumentationFromEnvironment
+from traversal import bidirectionalSearch, breadthFirstTraversal, depthFirstTraversal
+from rendering import DRAW_MAX_NODES, draw, drawingData, degreeCentralityHistogram, histogramFigure, levelOfDetail, networkFigure, waitForRenders
+from recommendation import FriendOfFriendIndex, countFriendOfFriendPairs, countFriendOfFriendPairsParallel, selectTopPairs
 import heapq
+from pathlib import Path
+from typing import Iterable, Iterator
+from concurrent.futures import Future
+
+# Methods measured when instrumentation is enabled
+INSTRUMENTED_METHODS = [
+  'addEdge', 'removeEdge', 'findImportantPeople', 'findTopPeople', 'connectCommunities',
+  'findLargestCommunities', 'findLargestCliques', 'betweennessCentrality', 'pathExist',
+  'recommendedFriends', 'liveRecommendedFriends', 'pathExistBFS', 'pathExistDFS',
+  'getDistanceWithCurrentNode', 'getShortestPath', 'buildDistanceOracle', 'getDistances',
+  'pageRank', 'hits', 'findInfluencers', 'detectCommunities',
+]
 
 class SocialNetwork:
-  def __init__(self, fbGraph: nx.Graph) -> None:
-    self.fbGraph = fbGraph
-    # To record all the traverse path for all the nodes
-    # to determine if the current node has traverse all path before
-    self.traversePath = self.traversePathWithAllNodes()
-
-  def drawGraph(self, degreeDistribution: bool = False) -> None:
-    plt.figure(figsize=(8, 8))
-    if degreeDistribution:
-      plt.title(label="Facebook degree centrality")
-      plt.hist(list(nx.degree_centrality(self.fbGraph).values()))
+  # instrument is True (a private Instrumentation), an Instrumentation to share, False, or None
+  # to follow the SOCIAL_NET_INSTRUMENT environment variable
+  def __init__(self, fbGraph: nx.Graph = None, csrGraph: CSRGraph = None, instrument=None) -> None:
+    self._fbGraph = fbGraph
+    # Whether _fbGraph is a private copy that addEdge/removeEdge may change
+    self._ownsGraph = False
+    # Incremented on every change to the graph
+    self.version = 0
+    # Contiguous int ids with offset and neighbour arrays, built once so that
+    # traversals do not pay networkx dict lookups and view filtering per edge
+    self._csrGraph = csrGraph if csrGraph is not None else CSRGraph.fromNetworkx(fbGraph)
+    # Connected components of all the nodes, to determine
+    # if there is a path between two nodes without traversing the graph
+    self._traversePath = self.traversePathWithAllNodes()
+    # Degree buckets, built on the first findImportantPeople and kept up to date by edge changes
+    self._degreeIndex = None
+    # Friend-of-friend table, built on the first liveRecommendedFriends and kept up to date by edge changes
+    self._friendOfFriendIndex = None
+    # The last PageRank and HITS hub vectors, kept across edge changes to warm start the next run
+    self._pageRankStart = None
+    self._hubsStart = None
+    self._clearCaches()
+    # Per-method timings, memory peaks and algorithm counters, None when disabled. The methods
+    # are only wrapped on enabled instances, so a disabled network pays nothing for it
+    if instrument is None:
+      self.instrumentation = instrumentationFromEnvironment()
+    elif instrument is True:
+      self.instrumentation = Instrumentation()
     else:
-      plt.title(label="Facebook Network")
-      nx.draw(self.fbGraph, with_labels=True)
-    plt.show(block = False)
-    plt.pause(5)
+      self.instrumentation = instrument or None
+    if self.instrumentation is not None:
+      for name in INSTRUMENTED_METHODS:
+        setattr(self, name, self.instrumentation.wrap(getattr(self, name), name))
+
+  # _clearCaches drops every result computed from the current graph
+  def _clearCaches(self) -> None:
+    # The largest cliques searched so far, and how many were asked for
+    self._largestCliques = None
+    self._largestCliquesK = 0
+    # Betweenness scores per sampling setting
+    self._betweenness = {}
+    # Landmark distances for batched distance queries
+    self._distanceOracle = None
+    # PageRank and HITS score vectors and dicts per setting
+    self._pageRank = {}
+    self._hits = {}
+    # Label propagation communities per seed
+    self._communities = {}
+
+  # fromStore opens a graph saved by graph_store.saveGraph. The adjacency is memory mapped,
+  # and the networkx graph is only built if a networkx based method asks for it
+  @classmethod
+  def fromStore(cls, storePath: str, instrument=None) -> 'SocialNetwork':
+    return cls(csrGraph=loadGraph(storePath), instrument=instrument)
+
+  # _counters is the dict the kernels add their counters to, or None when not instrumented
+  def _counters(self) -> dict:
+    return self.instrumentation.counters if self.instrumentation is not None else None
+
+  @property
+  def fbGraph(self) -> nx.Graph:
+    if self._fbGraph is None:
+      self._fbGraph = self.csrGraph.toNetworkx()
+    return self._fbGraph
+
+  # The CSR index is rebuilt from the networkx graph after it was changed
+  @property
+  def csrGraph(self) -> CSRGraph:
+    if self._csrGraph is None:
+      self._csrGraph = CSRGraph.fromNetworkx(self._fbGraph)
+    return self._csrGraph
+
+  @property
+  def traversePath(self) -> ConnectivityIndex:
+    if self._traversePath is None:
+      self._traversePath = self.traversePathWithAllNodes()
+    return self._traversePath
+
+  @property
+  def degreeIndex(self) -> DegreeIndex:
+    if self._degreeIndex is None:
+      self._degreeIndex = DegreeIndex(self.csrGraph)
+    return self._degreeIndex
+
+  # _mutableGraph returns a private copy of the graph the first time it is changed,
+  # so the caller's graph (or a frozen subgraph view) is never modified. The copy keeps the
+  # node order of the CSR index, which keeps the contiguous ids stable while no node is added,
+  # and the CSR neighbour order of every node, which the friend-of-friend counts depend on.
+  # The graph may not have that order (toNetworkx fills undirected rows out of order), and
+  # add_edges_from would reorder the neighbours, so the adjacency dicts are filled from the CSR rows
+  def _mutableGraph(self) -> nx.Graph:
+    if not self._ownsGraph:
+      graph = self.fbGraph
+      csrGraph = self.csrGraph
+      nodes = csrGraph.nodes
+      mutableGraph = graph.__class__()
+      mutableGraph.graph.update(graph.graph)
+      mutableGraph.add_nodes_from((node, dict(graph.nodes[node])) for node in nodes)
+      adjacency = mutableGraph._adj
+      for i, node in enumerate(nodes):
+        for neighbor in (nodes[j] for j in csrGraph.neighbors(i)):
+          data = graph.adj[node][neighbor]
+          # Both directions of an undirected edge share one attribute dict
+          sharedData = None if graph.is_directed() else adjacency[neighbor].get(node)
+          adjacency[node][neighbor] = sharedData if sharedData is not None else dict(data)
+          if graph.is_directed():
+            mutableGraph._pred[neighbor][node] = adjacency[node][neighbor]
+      self._fbGraph, self._ownsGraph = mutableGraph, True
+    return self._fbGraph
+
+  # addEdge adds a friendship (or a follow for directed graphs). The degree index is updated
+  # in O(1), the connectivity index with one union while no node is new, and the CSR index
+  # and the other cached results are rebuilt on their next use
+  def addEdge(self, firstVertex, secondVertex, **attributes) -> None:
+    graph = self._mutableGraph()
+    if graph.has_edge(firstVertex, secondVertex):
+      graph.add_edge(firstVertex, secondVertex, **attributes)
+      return
+    newNodes = [node for node in dict.fromkeys((firstVertex, secondVertex)) if node not in graph]
+    graph.add_edge(firstVertex, secondVertex, **attributes)
+    if self._friendOfFriendIndex is not None:
+      self._friendOfFriendIndex.edgeAdded(firstVertex, secondVertex)
+
+    if self._degreeIndex is not None:
+      for node in newNodes:
+        self._degreeIndex.addNode(node)
+      self._degreeIndex.increment(firstVertex)
+      self._degreeIndex.increment(secondVertex)
+    if newNodes:
+      self._traversePath = None
+    elif self._traversePath is not None:
+      nodeIndex = self._traversePath.csrGraph.nodeIndex
+      self._traversePath.union(nodeIndex[firstVertex], nodeIndex[secondVertex])
+    self._graphChanged()
+
+  # removeEdge removes a friendship. Components may split, so the connectivity index
+  # is rebuilt on its next use
+  def removeEdge(self, firstVertex, secondVertex) -> None:
+    graph = self._mutableGraph()
+    if not graph.has_edge(firstVertex, secondVertex):
+      raise nx.NetworkXError(f"The edge {firstVertex}-{secondVertex} is not in the graph")
+    if self._friendOfFriendIndex is not None:
+      self._friendOfFriendIndex.edgeRemoving(firstVertex, secondVertex)
+    graph.remove_edge(firstVertex, secondVertex)
+    if self._friendOfFriendIndex is not None:
+      self._friendOfFriendIndex.edgeRemoved(firstVertex, secondVertex)
+    if self._degreeIndex is not None:
+      self._degreeIndex.decrement(firstVertex)
+      self._degreeIndex.decrement(secondVertex)
+    self._traversePath = None
+    self._graphChanged()
+
+  # addEdges applies a batch or a stream of new edges, given as (u, v) or (u, v, attributes)
+  def addEdges(self, edges: Iterable[tuple]) -> None:
+    for edge in edges:
+      self.addEdge(*edge[:2], **(edge[2] if len(edge) > 2 else {}))
+
+  # removeEdges applies a batch or a stream of removed (u, v) edges
+  def removeEdges(self, edges: Iterable[tuple]) -> None:
+    for edge in edges:
+      self.removeEdge(*edge[:2])
+
+  def _graphChanged(self) -> None:
+    self._csrGraph = None
+    self._clearCaches()
+    self.version += 1
+
+  # drawGraph draws the network, or the histogram of degree centralities counted with a bincount.
+  # With an output path (.png, .svg, ...) the file is written by a background process and the
+  # returned future completes when it is done, so the analysis does not wait for the drawing.
+  # Graphs larger than maxNodes are drawn from a level of detail sample: the users with the
+  # most friends ('degree') or the densest k-core that fits ('core')
+  def drawGraph(self, degreeDistribution: bool = False, outputPath: str = None, maxNodes: int = DRAW_MAX_NODES, detail: str = 'degree') -> Future:
+    csrGraph = self.csrGraph
+    if degreeDistribution:
+      return draw(histogramFigure, outputPath, "Facebook degree centrality", *degreeCentralityHistogram(csrGraph))
+
+    keep = levelOfDetail(csrGraph, maxNodes, detail)
+    title = "Facebook Network"
+    if len(keep) < csrGraph.numberOfNodes():
+      title += f" ({len(keep)} of {csrGraph.numberOfNodes()} users)"
+    return draw(networkFigure, outputPath, title, *drawingData(csrGraph, keep), csrGraph.directed)
 
   # findImportantPeople will use degree centrality to determine the most important Facebook person
-  # that have many friends or being followed by others facebook user
+  # that have many friends or being followed by others facebook user.
+  # The degree index answers it from the top bucket, without a pass over the graph
   def findImportantPeople(self) -> list[tuple]:
-    if len(self.fbGraph.nodes()) == 0:
+    if len(self.degreeIndex) == 0:
       return []
 
-    degCent = nx.degree_centrality(self.fbGraph)
-    degCent = {k: v for k, v in sorted(degCent.items(), key=lambda item: item[1], reverse=True)}
-    maxDegCent = max(list(degCent.values()))
-    importantPeople = [(n, dc) for n, dc in degCent.items() if dc == maxDegCent]
-    return importantPeople
+    return [(n, self._degreeCentrality(degree)) for n, degree in self.degreeIndex.maxDegreeNodes()]
+
+  # findTopPeople returns the topK people with the highest degree centrality,
+  # ties in the order the people joined the graph
+  def findTopPeople(self, topK: int = 10) -> list[tuple]:
+    return [(n, self._degreeCentrality(degree)) for n, degree in self.degreeIndex.topK(topK)]
+
+  # _degreeCentrality normalizes a degree the same way as networkx degree_centrality
+  def _degreeCentrality(self, degree: int) -> float:
+    numberOfNodes = len(self.degreeIndex)
+    if numberOfNodes <= 1:
+      return 1
+    return degree * (1.0 / (numberOfNodes - 1.0))
 
   # connectCommunities will find the two largest communities based on the cliques and
-  # determine the bottleneck user based on the number of friends or followers
-  # they have. Afterwards, if there is a path or similar interest between them, we can
+  # determine the bottleneck user based on the number of shortest paths in the whole network
+  # they are on (approximate betweenness centrality sampled from pivot users). Afterwards,
+  # if there is a path or similar interest between them, we can
   # recommend the bottle neck's user to other followers/friends
   # to increase the reach
-  def connectCommunities(self)-> int:
-    if len(self.fbGraph.nodes()) == 0:
+  # The communities are the largest cliques ('clique') or the largest label propagation
+  # communities ('labelPropagation'), see largestCommunities
+  def connectCommunities(self, timeBudget: float = None, pivots: int = None, workers: int = 1, method: str = 'clique', seed: int = 0)-> int:
+    if self.csrGraph.numberOfNodes() == 0:
       return -1
 
-    cliques = sorted(nx.find_cliques(self.fbGraph), key=lambda x: len(x))
-    largestClique = self.fbGraph.subgraph(set(cliques[-1])).copy()
-    secondLargestClique = self.fbGraph.subgraph(set(cliques[-2])).copy()
-    largestCliqueBetweenessCentrality = nx.betweenness_centrality(largestClique)
-    secondLargestCliqueBetweenessCentrality = nx.betweenness_centrality(secondLargestClique)
-    largestCliqueBottleneckUser = max(largestCliqueBetweenessCentrality, key=largestCliqueBetweenessCentrality.get)
-    secondLargestCliqueBottleneckUser = max(secondLargestCliqueBetweenessCentrality, key=secondLargestCliqueBetweenessCentrality.get)
-    #pathExist = (largestCliqueBottleneckUser, secondLargestCliqueBottleneckUser) in self.traversePath or (largestCliqueBottleneckUser, secondLargestCliqueBottleneckUser) in self.traversePath
-    distanceBetweenTwoUsers = self.getDistanceWithCurrentNode(largestCliqueBottleneckUser, secondLargestCliqueBottleneckUser)
+    cliques = self.largestCommunities(2, method, timeBudget, seed)
+    if len(cliques) < 2:
+      return -1
+    # Inside a clique every member scores the same, so the bottleneck is picked from the global scores
+    betweenness = self.betweennessCentrality(pivots=pivots, workers=workers)
+    largestCliqueBottleneckUser = max(cliques[0], key=betweenness.get)
+    secondLargestCliqueBottleneckUser = max(cliques[1], key=betweenness.get)
+    pathExist = (largestCliqueBottleneckUser, secondLargestCliqueBottleneckUser) in self.traversePath
+    # Only search for the distance when the two users share a component
+    distanceBetweenTwoUsers = self.getDistanceWithCurrentNode(largestCliqueBottleneckUser, secondLargestCliqueBottleneckUser) if pathExist else -1
     print("Distance between two bottleneck users:", distanceBetweenTwoUsers)
     #print("There is path between the two largest clique", pathExist)
     if distanceBetweenTwoUsers:
@@ -64,84 +265,289 @@ class SocialNetwork:
   # findLargestCommunities can find the largest cliques
   # based on the shared interest
   # (e.g https://www.wired.com/story/facebook-people-you-may-know-friend-suggestions/ )
-  def findLargestCommunities(self, isDrawing: bool = False)-> nx.Graph:
-    if len(self.fbGraph.nodes()) == 0:
+  # With an output path the drawing is written in the background (see drawGraph), and
+  # only the clique and its best connected friends are drawn when there are more than maxNodes.
+  # With method='labelPropagation' the largest label propagation community is returned instead,
+  # which scales to large sparse graphs where the largest clique is tiny
+  def findLargestCommunities(self, isDrawing: bool = False, timeBudget: float = None, outputPath: str = None, maxNodes: int = DRAW_MAX_NODES, method: str = 'clique', seed: int = 0)-> nx.Graph:
+    if self.csrGraph.numberOfNodes() == 0:
       return None
 
-    largestClique = set(sorted(nx.find_cliques(self.fbGraph), key=lambda x: len(x))[-1])
+    # Search the two largest communities, so that connectCommunities reuses the cached result
+    largestClique = set(self.largestCommunities(2, method, timeBudget, seed)[0])
     facebookLargestClique = self.fbGraph.subgraph(largestClique).copy()
-    print("Facebook largest clique", facebookLargestClique.nodes())
-    # Go out 1 degree of separation
-    for node in list(facebookLargestClique.nodes()):
-        facebookLargestClique.add_nodes_from(self.fbGraph.neighbors(node))
-        facebookLargestClique.add_edges_from(zip([node]*len(list(self.fbGraph.neighbors(node))), self.fbGraph.neighbors(node)))
-
-    if isDrawing:
-      nodePosition = nx.spring_layout(facebookLargestClique)
-      plt.figure(figsize=(8, 8))
-      plt.title("Largest Clique in the Facebook Graph")
-      nx.draw(facebookLargestClique, nodePosition, with_labels=True)
-      plt.show(block = False)
-      plt.pause(5)
+    if method == 'clique':
+      print("Facebook largest clique", facebookLargestClique.nodes())
+      # Go out 1 degree of separation
+      for node in list(facebookLargestClique.nodes()):
+          facebookLargestClique.add_nodes_from(self.fbGraph.neighbors(node))
+          facebookLargestClique.add_edges_from(zip([node]*len(list(self.fbGraph.neighbors(node))), self.fbGraph.neighbors(node)))
+    else:
+      print("Facebook largest community", len(largestClique), "users")
+
+    if isDrawing or outputPath is not None:
+      communityGraph = CSRGraph.fromNetworkx(facebookLargestClique)
+      cliqueNodes = np.array([communityGraph.indexOf(node) for node in largestClique], dtype=np.int64)
+      keep = levelOfDetail(communityGraph, max(maxNodes, len(cliqueNodes)), pinned=cliqueNodes)
+      title = "Largest Clique in the Facebook Graph" if method == 'clique' else "Largest Community in the Facebook Graph"
+      draw(networkFigure, outputPath, title, *drawingData(communityGraph, keep), communityGraph.directed)
 
     return facebookLargestClique
 
-  # traversePathWithAllNodes will traverse to all the nodes and record the traverse path
-  # Time complexity: O(V^2 * (V+E))
-  # Space complexity: O(V*P)
-  def traversePathWithAllNodes(self) -> set:
-      traversePath = set()
-      for node, _ in self.fbGraph.nodes(data=True):
-        for neighbour in self.fbGraph.neighbors(node):
-            if (node, neighbour) not in traversePath not in traversePath and self.pathExistBFS(node, neighbour):
-                traversePath.add((node, neighbour))
+  # largestCommunities returns the users of the k largest communities, largest first: maximal cliques
+  # ('clique') or label propagation communities ('labelPropagation')
+  def largestCommunities(self, k: int = 2, method: str = 'clique', timeBudget: float = None, seed: int = 0) -> list[list]:
+    if method == 'clique':
+      return self.findLargestCliques(k, timeBudget)
+    if method == 'labelPropagation':
+      communities = self.detectCommunities(seed)
+      nodes = self.csrGraph.nodes
+      return [[nodes[node] for node in communities.members(community)] for community in range(min(k, communities.numberOfCommunities()))]
+    raise ValueError(f"Unknown community method {method}, expected 'clique' or 'labelPropagation'")
+
+  # detectCommunities splits the users into communities with seeded, vectorized label propagation:
+  # every user repeatedly joins the community most of its friends belong to. Returns the community
+  # of every user (by contiguous id, see csrGraph.nodes) and the community sizes, largest first.
+  # Results are cached per seed
+  # Time complexity: O(iterations * E log E)
+  def detectCommunities(self, seed: int = 0, maxIterations: int = 100) -> Communities:
+    cacheKey = (seed, maxIterations)
+    if cacheKey not in self._communities:
+      communities = labelPropagation(self.csrGraph, seed, maxIterations)
+      if self.instrumentation is not None:
+        self.instrumentation.count('communities.iterations', communities.iterations)
+      self._communities[cacheKey] = communities
+    return self._communities[cacheKey]
+
+  # communityMemberships maps every user to its community id, 0 being the largest community
+  def communityMemberships(self, seed: int = 0) -> dict:
+    return dict(zip(self.csrGraph.nodes, self.detectCommunities(seed).membership.tolist()))
 
-      return traversePath
+  # findLargestCliques returns the k largest maximal cliques, largest first, with a pruned
+  # branch and bound search that never stores the other cliques. The result is cached and
+  # shared by findLargestCommunities and connectCommunities. With a time budget (seconds)
+  # the best cliques found so far are returned, and a later call without one searches again
+  def findLargestCliques(self, k: int = 2, timeBudget: float = None) -> list[list]:
+    cachedCliques = self._largestCliques
+    if cachedCliques is None or self._largestCliquesK < k or (not cachedCliques.complete and timeBudget is None):
+      cachedCliques = findTopKCliques(self.csrGraph, k, timeBudget)
+      if self.instrumentation is not None:
+        self.instrumentation.count('cliques.searchSteps', cachedCliques.steps)
+        self.instrumentation.count('cliques.maximalCliques', cachedCliques.maximalCliques)
+      self._largestCliques, self._largestCliquesK = cachedCliques, k
+
+    nodes = self.csrGraph.nodes
+    return [[nodes[node] for node in clique] for clique in cachedCliques.cliques[:k]]
+
+  # betweennessCentrality estimates the normalized betweenness of every user from the shortest
+  # paths of sampled pivot users: either the given number of pivots, or enough of them to keep
+  # every score within epsilon of the exact one with probability 1 - delta.
+  # With pivots equal to the number of users it is exact. Results are cached per sampling setting
+  def betweennessCentrality(self, pivots: int = None, epsilon: float = 0.1, delta: float = 0.1, seed: int = 0, workers: int = 1) -> dict:
+    cacheKey = (pivots, epsilon, delta, seed)
+    if cacheKey not in self._betweenness:
+      scores = approximateBetweenness(self.csrGraph, pivots, epsilon, delta, seed, workers)
+      if self.instrumentation is not None:
+        numberOfNodes = self.csrGraph.numberOfNodes()
+        self.instrumentation.count('betweenness.pivots', pivotsForErrorBound(numberOfNodes, epsilon, delta) if pivots is None else min(pivots, numberOfNodes))
+      self._betweenness[cacheKey] = dict(zip(self.csrGraph.nodes, scores.tolist()))
+    return self._betweenness[cacheKey]
+
+  # pageRank ranks the users by how likely a random walk along the follow edges is to visit them,
+  # so being followed by influential users counts more than being followed by many.
+  # The power iteration starts from the scores before the last edge changes, which converges
+  # in a few iterations after a small change. Results are cached per setting
+  def pageRank(self, alpha: float = 0.85, tolerance: float = 1e-6, maxIterations: int = 100) -> dict:
+    return self._pageRankScores(alpha, tolerance, maxIterations)[1]
+
+  # _pageRankScores returns the score vector by contiguous id next to the dict by user
+  def _pageRankScores(self, alpha: float = 0.85, tolerance: float = 1e-6, maxIterations: int = 100) -> tuple[np.ndarray, dict]:
+    cacheKey = (alpha, tolerance, maxIterations)
+    if cacheKey not in self._pageRank:
+      result = pageRank(self.csrGraph, alpha, tolerance, maxIterations, self._warmStart(self._pageRankStart))
+      self._pageRankStart = result.scores
+      if self.instrumentation is not None:
+        self.instrumentation.count('pageRank.iterations', result.iterations)
+      self._pageRank[cacheKey] = (result.scores, dict(zip(self.csrGraph.nodes, result.scores.tolist())))
+    return self._pageRank[cacheKey]
+
+  # hits returns the hub scores (users following good authorities) and authority scores
+  # (users followed by good hubs), warm started and cached like pageRank
+  def hits(self, tolerance: float = 1e-8, maxIterations: int = 100) -> tuple[dict, dict]:
+    return self._hitsScores(tolerance, maxIterations)[2:]
+
+  # _hitsScores returns the hub and authority vectors by contiguous id next to the dicts by user
+  def _hitsScores(self, tolerance: float = 1e-8, maxIterations: int = 100) -> tuple[np.ndarray, np.ndarray, dict, dict]:
+    cacheKey = (tolerance, maxIterations)
+    if cacheKey not in self._hits:
+      hubs, authorities = hits(self.csrGraph, tolerance, maxIterations, self._warmStart(self._hubsStart))
+      self._hubsStart = hubs.scores
+      if self.instrumentation is not None:
+        self.instrumentation.count('hits.iterations', hubs.iterations)
+      nodes = self.csrGraph.nodes
+      self._hits[cacheKey] = (hubs.scores, authorities, dict(zip(nodes, hubs.scores.tolist())), dict(zip(nodes, authorities.tolist())))
+    return self._hits[cacheKey]
+
+  # _warmStart extends a previous score vector to the current users. Edge changes keep the order
+  # of the existing users and append new ones, which start from the average score
+  def _warmStart(self, previous: np.ndarray) -> np.ndarray:
+    numberOfNodes = self.csrGraph.numberOfNodes()
+    if previous is None or len(previous) == 0 or len(previous) > numberOfNodes:
+      return None
+    return np.concatenate((previous, np.full(numberOfNodes - len(previous), previous.mean())))
+
+  # findInfluencers returns the topK users by PageRank ('pagerank') or HITS authority ('hits'),
+  # highest first, among the users matching every attribute filter, e.g.
+  # findInfluencers(5, category='D', occupation=['scientist', 'politician'])
+  def findInfluencers(self, topK: int = 10, method: str = 'pagerank', **attributeFilters) -> list[tuple]:
+    if method == 'pagerank':
+      scores = self._pageRankScores()[0]
+    elif method == 'hits':
+      scores = self._hitsScores()[1]
+    else:
+      raise ValueError(f"Unknown influence method {method}, expected 'pagerank' or 'hits'")
+    nodes = self.csrGraph.nodes
+    candidates = np.flatnonzero(self.attributeMask(**attributeFilters))
+    values = np.asarray(scores, dtype=np.float64)[candidates]
+    if len(values) > topK:
+      top = np.argpartition(-values, topK - 1)[:topK]
+      candidates, values = candidates[top], values[top]
+    # Highest score first, ties in the order the users joined the graph
+    order = np.lexsort((candidates, -values))
+    return [(nodes[node], float(score)) for node, score in zip(candidates[order].tolist(), values[order].tolist())]
+
+  # attributeMask marks the users whose attributes match every filter. A filter is a value or a
+  # collection of accepted values. Attributes come from the store columns, or from the networkx graph
+  def attributeMask(self, **attributeFilters) -> np.ndarray:
+    csrGraph = self.csrGraph
+    mask = np.ones(csrGraph.numberOfNodes(), dtype=bool)
+    for name, accepted in attributeFilters.items():
+      accepted = [accepted] if isinstance(accepted, (str, int, float, bool)) else list(accepted)
+      if name in csrGraph.nodeAttributes:
+        values, present = csrGraph.nodeAttributes[name]
+        mask &= present & np.isin(values, accepted)
+      else:
+        nodeData = self.fbGraph.nodes
+        acceptedValues = set(accepted)
+        mask &= np.array([nodeData[node].get(name) in acceptedValues for node in csrGraph.nodes], dtype=bool)
+    return mask
+
+  # followers are the users with an edge to the user (everyone adjacent for undirected graphs),
+  # read from the reversed CSR arrays
+  def followers(self, user) -> list:
+    csrGraph = self.csrGraph
+    nodes = csrGraph.nodes
+    return [nodes[node] for node in csrGraph.reverse().neighbors(csrGraph.indexOf(user))]
+
+  # following are the users the user has an edge to
+  def following(self, user) -> list:
+    csrGraph = self.csrGraph
+    nodes = csrGraph.nodes
+    return [nodes[node] for node in csrGraph.neighbors(csrGraph.indexOf(user))]
+
+  # traversePathWithAllNodes will label the connected component of every node
+  # with a disjoint set, so that "is there a path between u and v" is answered in O(1)
+  # Time complexity: O((V + E) * a(V))
+  # Space complexity: O(V)
+  def traversePathWithAllNodes(self) -> ConnectivityIndex:
+      return ConnectivityIndex(self.csrGraph)
+
+  # pathExist will answer from the connectivity index, and only falls back
+  # to BFS for directed graphs where sharing a weak component is not enough
+  def pathExist(self, startVertex: int, endVertex: int) -> bool:
+    csrGraph = self.csrGraph
+    start, end = csrGraph.indexOf(startVertex), csrGraph.indexOf(endVertex)
+    if not self.traversePath.connected(start, end):
+      return False
+    return not csrGraph.directed or self.pathExistBFS(startVertex, endVertex)
 
   # recommendedFriends will recommend friends who shared similar interest
   # but hasn't been friends yet by creating a combination between the current user's neighbor
-  # If there is no connection, we will recommend them
-  def recommendedFriends(self) -> list[tuple]:
+  # If there is no connection, we will recommend them.
+  # The batched mode counts the pairs of every node at once with vectorized NumPy chunks,
+  # the serial mode walks the nodes one by one; both return the pairs whose count
+  # is greater than the topK-th largest count, in the order they were first found.
+  # With more than one worker the batched counting is sharded across processes
+  def recommendedFriends(self, topK: int = 10, batched: bool = True, workers: int = 1) -> list[tuple]:
+    if topK < 1:
+      raise ValueError("topK must be at least 1")
+    if self.instrumentation is not None:
+      # Every pair of friends of every user is looked at once
+      degrees = self.csrGraph.degrees().astype(np.int64)
+      self.instrumentation.count('recommendedFriends.pairsExamined', int((degrees * (degrees - 1) // 2).sum()))
+
+    if workers > 1:
+      friendOfFriendCounts = countFriendOfFriendPairsParallel(self.csrGraph, topK, workers)
+      nodes = self.csrGraph.nodes
+      return [(nodes[first], nodes[second]) for first, second in selectTopPairs(friendOfFriendCounts, topK)]
+
+    if batched:
+      friendOfFriendCounts = countFriendOfFriendPairs(self.csrGraph)
+      nodes = self.csrGraph.nodes
+      return [(nodes[first], nodes[second]) for first, second in selectTopPairs(friendOfFriendCounts, topK)]
+
     recommendedFriends = defaultdict(int)
-    for node, _ in self.fbGraph.nodes(data=True):
+    csrGraph = self.csrGraph
+    nodes = csrGraph.nodes
+    for node in range(csrGraph.numberOfNodes()):
+        neighbors = csrGraph.neighborArray(node)
+        if len(neighbors) < 2:
+            continue
         # Create a combination of 2 with all the neighbor nodes that the node has
-        # and determine if there is a path between them. If not,
-        # add them
-        for firstNeighborFriend, secondNeighborFriend  in combinations(self.fbGraph.neighbors(node), 2):
-            #if (firstNeighborFriend, secondNeighborFriend) not in self.traversePath:
-            if not self.pathExistBFS(firstNeighborFriend, secondNeighborFriend):
-                recommendedFriends[(firstNeighborFriend, secondNeighborFriend)] += 1
-
-    # Identify the top 10 pairs of users
-    sortedRecommendedFriends = sorted(recommendedFriends.values())
-    top10Pairs = [pair for pair, count in recommendedFriends.items() if count > sortedRecommendedFriends[-10]]
-    return top10Pairs
+        # (in the same order as itertools.combinations) and determine if they are
+        # already friends. If not, add them
+        firstIndices, secondIndices = np.triu_indices(len(neighbors), 1)
+        firstNeighborFriends, secondNeighborFriends = neighbors[firstIndices], neighbors[secondIndices]
+        notFriends = ~csrGraph.hasEdges(firstNeighborFriends, secondNeighborFriends)
+        for firstNeighborFriend, secondNeighborFriend in zip(firstNeighborFriends[notFriends].tolist(), secondNeighborFriends[notFriends].tolist()):
+            recommendedFriends[(nodes[firstNeighborFriend], nodes[secondNeighborFriend])] += 1
+
+    # Identify the top k pairs of users with a bounded heap instead of sorting every count
+    topCounts = heapq.nlargest(topK, recommendedFriends.values())
+    if len(topCounts) < topK:
+      return list(recommendedFriends)
+    topPairs = [pair for pair, count in recommendedFriends.items() if count > topCounts[-1]]
+    return topPairs
+
+  # traverseBFS lazily yields (user, depth, parent) for every user reachable from startVertex
+  # in breadth first order, so callers can stream or stop early without materializing the visit
+  def traverseBFS(self, startVertex: int) -> Iterator[tuple]:
+    nodes = self.csrGraph.nodes
+    for node, depth, parent in breadthFirstTraversal(self.csrGraph, self.csrGraph.indexOf(startVertex), self._counters()):
+      yield nodes[node], depth, nodes[parent] if parent is not None else None
+
+  # traverseDFS is the depth first (preorder) counterpart of traverseBFS
+  def traverseDFS(self, startVertex: int) -> Iterator[tuple]:
+    nodes = self.csrGraph.nodes
+    for node, depth, parent in depthFirstTraversal(self.csrGraph, self.csrGraph.indexOf(startVertex), counters=self._counters()):
+      yield nodes[node], depth, nodes[parent] if parent is not None else None
+
+  # liveRecommendedFriends answers the same question as recommendedFriends (the pairs whose count
+  # is greater than the topK-th largest count, highest counts first) from a friend-of-friend table
+  # that addEdge/removeEdge keep current, so new friendships only cost the affected neighbourhoods
+  def liveRecommendedFriends(self, topK: int = 10) -> list[tuple]:
+    if topK < 1:
+      raise ValueError("topK must be at least 1")
+    if self._friendOfFriendIndex is None:
+      # The table follows the adjacency order of the graph that later edges are added to
+      graph = self._mutableGraph()
+      self._friendOfFriendIndex = FriendOfFriendIndex(graph, self.csrGraph)
+    return self._friendOfFriendIndex.topPairs(topK)
 
   # pathExistBFS will use breath first search
   # https://www.geeksforgeeks.org/breadth-first-search-or-bfs-for-a-graph/#
   # to determine if the path between two vertexes are connected in the shortest way possible
   # Step 1: Begins with a node, traverses all its adjacent
   # Step 2: Once all adjacent are visited, then their adjacent are traversed
+  # The traversal stops as soon as the end vertex is discovered
   # Time Complexity: O(v + e) (since its traverse through all vertex and edge in worst case)
   def pathExistBFS(self, startVertex: int, endVertex: int) -> bool:
-    visitedNodes = set()
-    # Begin traverse from the starting node
-    queue = [startVertex]
-
-    # Traverse all its adjacent node
-    for node in queue:
-        # Once all adjacent are visited, then their adjacent are traversed
-        neighbors = self.fbGraph.neighbors(node)
-        if endVertex in neighbors:
-            return True
-        else:
-            visitedNodes.add(node)
-            queue.extend([n for n in neighbors if n not in visitedNodes])
-
-        # Check to see if there are any vertex that can be reached from the current node adjacent
-        # in order to know if there are any path that BFS can traverse
-        if node == queue[-1]:
-            return False
+    csrGraph = self.csrGraph
+    start, end = csrGraph.indexOf(startVertex), csrGraph.indexOf(endVertex)
+    # Nodes in different components can never be reached
+    if not self.traversePath.connected(start, end):
+      return False
+    return any(node == end for node, _, _ in breadthFirstTraversal(csrGraph, start, self._counters()))
 
   def pathExistDFS(self, startVertex: int, endVertex: int) -> bool:
       visitedNodes = set()
@@ -151,70 +557,105 @@ class SocialNetwork:
   # https://www.geeksforgeeks.org/python-program-for-depth-first-search-or-dfs-for-a-graph/
   # Step 1: Begins with a node, traverses to the first neighbour of the current node
   # Step 2: Once the current neighboard node read the depth of it, then their adjacent are traversed
+  # The search keeps an explicit stack, so it is not bounded by the recursion limit.
+  # visitedNodes holds user ids: users in it are not searched through, and the users
+  # the search reached are added to it (none when the two users are in different components)
   # Time Complexity: O(v + e) (since its traverse through all vertex and edge in worst case)
   def findPathBetweenTwoNodesDFS(self, currentVertex: int, endVertex: int, visitedNodes: set) -> bool:
-    if currentVertex == endVertex:
+    csrGraph = self.csrGraph
+    current, end = csrGraph.indexOf(currentVertex), csrGraph.indexOf(endVertex)
+    if current == end:
       return True
+    if not self.traversePath.connected(current, end):
+      return False
+    # The traversal works on contiguous ids, the search still starts from an already visited user
+    visited = {csrGraph.nodeIndex[node] for node in visitedNodes if node in csrGraph.nodeIndex and node != currentVertex}
+    found = any(node == end for node, _, _ in depthFirstTraversal(csrGraph, current, visited, self._counters()))
+    visitedNodes.update(csrGraph.nodes[node] for node in visited)
+    return found
+
+  # getDistanceWithCurrentNode will use a bidirectional breadth first search
+  # to get the shortest distance between two nodes: every edge has the same weight,
+  # so BFS levels are distances and no priority queue or per-node table is needed
+  # Time complexity: O(V + E) in the worst case, usually a small fraction of the graph
+  # Space complexity: O(visited nodes)
+  def getDistanceWithCurrentNode(self, startVertex: int, endVertex: int) -> int:
+    distance, _ = self._shortestPath(startVertex, endVertex, returnPath=False)
+    return distance
 
-    visitedNodes.add(currentVertex)
-    for neighbour in self.fbGraph.neighbors(currentVertex):
-      if neighbour not in visitedNodes and self.findPathBetweenTwoNodesDFS(neighbour, endVertex, visitedNodes):
-        return True
+  # getShortestPath returns the users on a shortest path between two users,
+  # or an empty list when there is none
+  def getShortestPath(self, startVertex: int, endVertex: int) -> list:
+    _, path = self._shortestPath(startVertex, endVertex, returnPath=True)
+    nodes = self.csrGraph.nodes
+    return [nodes[node] for node in path] if path else []
 
-    return False
+  def _shortestPath(self, startVertex: int, endVertex: int, returnPath: bool) -> tuple[int, list]:
+    csrGraph = self.csrGraph
+    start, end = csrGraph.indexOf(startVertex), csrGraph.indexOf(endVertex)
+    if not self.traversePath.connected(start, end):
+      return -1, None
+    return bidirectionalSearch(csrGraph, start, end, returnPath, self._counters())
 
-  # getDistanceWithCurrentNode will use dijkstra's algortihm
-  # to get the shortest distance between two nodes
-  # Time complexity: O((V + E) log V)
-  # Space complexity: O(v)
-  def getDistanceWithCurrentNode(self, startVertex: int, endVertex: int) -> int:
-    queue = [(0, startVertex)]
-    distances = {node: float('inf') for node in self.fbGraph.nodes()}
-    distances[startVertex] = 0
-    visitedNodes = set()
+  # buildDistanceOracle precomputes the BFS distances of k landmark users, the users with the most
+  # friends ('degree') or a seeded random sample ('random'), for getDistances
+  # Time complexity: O(k * (V + E))
+  # Space complexity: O(k * V) bytes
+  def buildDistanceOracle(self, landmarks: int = 16, strategy: str = 'degree', seed: int = 0) -> DistanceOracle:
+    self._distanceOracle = DistanceOracle.build(self.csrGraph, landmarks, strategy, seed, self.traversePath.componentLabels())
+    return self._distanceOracle
 
-    while queue:
-      currentDistance, currentNode = heapq.heappop(queue)
-      if currentNode in visitedNodes:
-        continue
+  # getDistances answers many "degrees of separation" questions at once from the distance oracle
+  # (built with the default landmarks on first use). Pairs whose landmark bounds meet need no search,
+  # the others fall back to the exact bidirectional search, or with exact=False get the upper bound
+  # (pairs no landmark reaches are still searched). Unreachable pairs are -1, like getDistanceWithCurrentNode
+  # Time complexity: O(P * k) plus one search per pair the bounds do not settle
+  def getDistances(self, pairs: Iterable[tuple], exact: bool = True) -> list[int]:
+    if self._distanceOracle is None:
+      self.buildDistanceOracle()
+    csrGraph = self.csrGraph
+    pairs = list(pairs)
+    sources = np.array([csrGraph.indexOf(first) for first, _ in pairs], dtype=np.int64)
+    targets = np.array([csrGraph.indexOf(second) for _, second in pairs], dtype=np.int64)
+    return self._distanceOracle.distances(sources, targets, exact, self._counters()).tolist()
 
-      if endVertex == currentNode:
-        return currentDistance
+  def saveDistanceOracle(self, oraclePath: str) -> None:
+    if self._distanceOracle is None:
+      self.buildDistanceOracle()
+    self._distanceOracle.save(oraclePath)
 
-      for neighbor in self.fbGraph.neighbors(currentNode):
-        if neighbor not in visitedNodes:
-          newDistance = currentDistance + 1
-          if newDistance < distances[neighbor]:
-            distances[neighbor] = newDistance
-            heapq.heappush(queue, (newDistance, neighbor))
+  # loadDistanceOracle reads an oracle saved for this graph instead of running the landmark searches
+  def loadDistanceOracle(self, oraclePath: str) -> DistanceOracle:
+    self._distanceOracle = DistanceOracle.load(oraclePath, self.csrGraph)
+    return self._distanceOracle
 
-    return -1
+# Where socialNetworkAnalysis writes its drawings
+PLOTS_DIR = Path('plots')
 
 def createSocialNet() -> SocialNetwork:
   dataPath = downloadDataset()
-  with open(dataPath[1], 'rb') as f:
-    fbGraph = pickle.load(f)
-
-  # Since pilotlib has a problem with performance for over than 2000 nodes with the corresponding edges
-  # We will only take the 200 nodes which have the highest degree (nodes that have most edges)
-  # and simulate a subgraph of fb
-  fbNodeDegree = dict(fbGraph.degree())
-  sortedNodes = sorted(fbNodeDegree.items(), key=lambda x: x[1], reverse=True)
-  topDegreeNodes = [node for node, _ in sortedNodes]
-  #topDegreeNodes = [node for node in list(fbGraph.nodes())[:10000]]
-  fbSubGraph = fbGraph.subgraph(topDegreeNodes)
-  print("Number of nodes", len(fbSubGraph.nodes()))
-  print("Number of edges", len(fbSubGraph.edges()))
-  sn = SocialNetwork(fbSubGraph)
-  sn.drawGraph()
+  # Load the memory mapped binary store, converting the pickle the first time
+  fbCSRGraph = openStore(dataPath[1])
+
+  # The whole graph is analysed; drawings only show a level of detail sample of the users
+  # with the highest degree, since pyplot can not lay out thousands of nodes in reasonable time
+  topDegreeNodes = np.argsort(-fbCSRGraph.degrees(), kind='stable')
+  #topDegreeNodes = np.arange(10000)
+  fbSubGraph = fbCSRGraph.subgraph(topDegreeNodes)
+  print("Number of nodes", fbSubGraph.numberOfNodes())
+  print("Number of edges", fbSubGraph.numberOfEdges())
+  sn = SocialNetwork(csrGraph=fbSubGraph)
+  sn.drawGraph(outputPath=PLOTS_DIR / 'network.png')
   return sn
 
 def socialNetworkAnalysis() -> None:
   sn = createSocialNet()
   importantPeople = sn.findImportantPeople()
   print("The most prolific people", importantPeople)
-  sn.drawGraph(degreeDistribution=True)
-  sn.findLargestCommunities()
+  sn.drawGraph(degreeDistribution=True, outputPath=PLOTS_DIR / 'degree_distribution.png')
+  sn.findLargestCommunities(outputPath=PLOTS_DIR / 'largest_clique.png')
   sn.connectCommunities()
   recommendedFriends = sn.recommendedFriends()
   print("Top 10 recommended friends:", recommendedFriends)
+  # The drawings were written in the background while the analysis ran
+  print("Plots written:", waitForRenders())
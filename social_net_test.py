@@ -1,9 +1,14 @@
 import unittest
+import random
 import pickle
 import networkx as nx
 from itertools import combinations
 from collections import defaultdict
 from social_net import SocialNetwork
+from csr_graph import CSRGraph
+from recommendation import countFriendOfFriendPairs
+from cliques import findTopKCliques
+from centrality import approximateBetweenness
 from dataset import downloadDataset
 from concurrent.futures import ThreadPoolExecutor
 
@@ -14,56 +19,6 @@ def runTest(test):
     return result
 
 class TestSocialNetworkAnalysis(unittest.TestCase):
-  def test_StressTestingFrom1000To20000NodesForRecommendedFriendsWithUnsortedData(self):
-      dataset = downloadDataset()
-      with open(dataset[1], 'rb') as f:
-        fbGraph = pickle.load(f)
-      for numberOfNodes in range(1000, 20000, 1000):
-        nodes = [node for node in list(fbGraph.nodes())[:numberOfNodes]]
-        fbSubGraph = fbGraph.subgraph(nodes)
-        sn = SocialNetwork(fbSubGraph)
-        sn.recommendedFriends()
-
-  def test_StressTestingFrom1000To20000NodesForRecommendedFriendsWithSortedDegreeData(self):
-    dataset = downloadDataset()
-    with open(dataset[1], 'rb') as f:
-      fbGraph = pickle.load(f)
-    for numberOfNodes in range(1000, 20000, 1000):
-      nodes = [node for node in list(fbGraph.nodes())[:numberOfNodes]]
-      fbSubGraph = fbGraph.subgraph(nodes)
-      sn = SocialNetwork(fbSubGraph)
-      sn.recommendedFriends()
-
-  def test_StressTestingFrom1000To20000NodesForConnectingComunities(self):
-    dataset = downloadDataset()
-    with open(dataset[1], 'rb') as f:
-      fbGraph = pickle.load(f)
-    for numberOfNodes in range(1000, 20000, 1000):
-      nodes = [node for node in list(fbGraph.nodes())[:numberOfNodes]]
-      fbSubGraph = fbGraph.subgraph(nodes)
-      sn = SocialNetwork(fbSubGraph)
-      sn.connectCommunities()
-
-  def test_StressTestingFrom1000To20000NodesForFindingImportantPeople(self):
-    dataset = downloadDataset()
-    with open(dataset[1], 'rb') as f:
-      fbGraph = pickle.load(f)
-    for numberOfNodes in range(1000, 20000, 1000):
-      nodes = [node for node in list(fbGraph.nodes())[:numberOfNodes]]
-      fbSubGraph = fbGraph.subgraph(nodes)
-      sn = SocialNetwork(fbSubGraph)
-      sn.findImportantPeople()
-
-  def test_StressTestingFrom1000To20000NodesForFindingLargestCommunities(self):
-    dataset = downloadDataset()
-    with open(dataset[1], 'rb') as f:
-      fbGraph = pickle.load(f)
-    for numberOfNodes in range(1000, 20000, 1000):
-      nodes = [node for node in list(fbGraph.nodes())[:numberOfNodes]]
-      fbSubGraph = fbGraph.subgraph(nodes)
-      sn = SocialNetwork(fbSubGraph)
-      sn.findLargestCommunities()
-
   def test_FindRecommendedFriends(self):
     dataset = downloadDataset()
     with open(dataset[1], 'rb') as f:
@@ -86,6 +41,48 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
     self.assertGreater(len(recommendedFriends), 0)
     self.assertEqual(expectedRecommendedFriends, recommendedFriends)
 
+  def test_FindRecommendedFriendsBatchedMatchesSerial(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(1500, 4, 0.3, seed=5), nx.gnp_random_graph(300, 0.03, seed=2, directed=True)]:
+      sn = SocialNetwork(fbGraph)
+      for topK in [1, 10, 250]:
+        self.assertEqual(sn.recommendedFriends(topK, batched=False), sn.recommendedFriends(topK))
+
+  def test_FindRecommendedFriendsParallelMatchesSerial(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(1500, 4, 0.3, seed=5), nx.gnp_random_graph(300, 0.03, seed=2, directed=True)]:
+      sn = SocialNetwork(fbGraph)
+      for topK in [1, 10, 250]:
+        self.assertEqual(sn.recommendedFriends(topK, batched=False), sn.recommendedFriends(topK, workers=3))
+
+  def test_FriendOfFriendCountsDoNotDependOnChunkSize(self):
+    sn = SocialNetwork(nx.powerlaw_cluster_graph(800, 4, 0.3, seed=9))
+    wholeCounts = countFriendOfFriendPairs(sn.csrGraph)
+    chunkedCounts = countFriendOfFriendPairs(sn.csrGraph, pairsPerChunk=97)
+    self.assertEqual(wholeCounts.keys.tolist(), chunkedCounts.keys.tolist())
+    self.assertEqual(wholeCounts.counts.tolist(), chunkedCounts.counts.tolist())
+    self.assertEqual(wholeCounts.firstSeen.tolist(), chunkedCounts.firstSeen.tolist())
+
+  def test_LiveRecommendedFriendsFollowEdgeChanges(self):
+    shuffledGraph = nx.Graph()
+    shuffledEdges = list(nx.powerlaw_cluster_graph(400, 3, 0.3, seed=14).edges())
+    random.Random(8).shuffle(shuffledEdges)
+    shuffledGraph.add_edges_from(shuffledEdges)
+    # A network loaded from CSR arrays, whose networkx view orders the neighbours differently
+    csrNetwork = lambda: SocialNetwork(csrGraph=CSRGraph.fromNetworkx(shuffledGraph))
+    for buildNetwork in [lambda: SocialNetwork(nx.powerlaw_cluster_graph(400, 3, 0.3, seed=13)),
+                         lambda: SocialNetwork(nx.gnp_random_graph(150, 0.05, seed=6, directed=True)), csrNetwork]:
+      sn = buildNetwork()
+      self.assertEqual(set(sn.recommendedFriends(25)), set(sn.liveRecommendedFriends(25)))
+      rng = random.Random(7)
+      for step in range(40):
+        nodes = list(sn.fbGraph.nodes())
+        addedEdges = [(rng.choice(nodes), rng.choice(nodes + [1000 + step])) for _ in range(5)]
+        sn.addEdges(edge for edge in addedEdges if not sn.fbGraph.has_edge(*edge))
+        sn.removeEdges(rng.sample(list(sn.fbGraph.edges()), 3))
+        for topK in [1, 10, 60]:
+          expectedRecommendedFriends = sn.recommendedFriends(topK)
+          self.assertEqual(set(expectedRecommendedFriends), set(sn.liveRecommendedFriends(topK)))
+          self.assertEqual(len(expectedRecommendedFriends), len(sn.liveRecommendedFriends(topK)))
+
   def test_FindRecommendedFriendsWithEmptyGraph(self):
     fbGraph = nx.Graph()
     sn = SocialNetwork(fbGraph)
@@ -112,6 +109,38 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
     importantPeople = sn.findImportantPeople()
     self.assertEqual([], importantPeople)
 
+  def test_FindImportantPeopleAfterEdgeChanges(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(500, 3, 0.3, seed=12), nx.gnp_random_graph(200, 0.03, seed=5, directed=True)]:
+      sn = SocialNetwork(fbGraph)
+      expectedGraph = fbGraph.copy()
+      numberOfEdges = fbGraph.number_of_edges()
+      sn.findImportantPeople()
+      rng = random.Random(4)
+      nodes = list(fbGraph.nodes())
+      for step in range(300):
+        edges = list(expectedGraph.edges())
+        if step % 3 == 2 and edges:
+          firstVertex, secondVertex = rng.choice(edges)
+          expectedGraph.remove_edge(firstVertex, secondVertex)
+          sn.removeEdge(firstVertex, secondVertex)
+        else:
+          firstVertex, secondVertex = rng.choice(nodes), rng.choice(nodes + [1000 + step])
+          expectedGraph.add_edge(firstVertex, secondVertex)
+          sn.addEdge(firstVertex, secondVertex)
+          nodes = list(expectedGraph.nodes())
+        if step % 25 == 0:
+          degCent = nx.degree_centrality(expectedGraph)
+          maxDegCent = max(degCent.values())
+          self.assertEqual([(n, dc) for n, dc in degCent.items() if dc == maxDegCent], sn.findImportantPeople())
+          expectedTopPeople = sorted(degCent.items(), key=lambda item: item[1], reverse=True)[:10]
+          self.assertEqual(expectedTopPeople, sn.findTopPeople(10))
+      # The caller's graph is left untouched
+      self.assertEqual(numberOfEdges, fbGraph.number_of_edges())
+      self.assertEqual(expectedGraph.number_of_edges(), sn.csrGraph.numberOfEdges())
+      for startVertex in nodes[::10]:
+        for endVertex in nodes[::7]:
+          self.assertEqual(nx.has_path(expectedGraph, startVertex, endVertex), sn.pathExistBFS(startVertex, endVertex))
+
   def test_ConnectCommunities(self):
     dataset = downloadDataset()
     with open(dataset[1], 'rb') as f:
@@ -119,17 +148,51 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
     nodes = [node for node in list(fbGraph.nodes())[:1000]]
     fbSubGraph = fbGraph.subgraph(nodes)
     sn = SocialNetwork(fbSubGraph)
-    cliques = sorted(nx.find_cliques(fbSubGraph), key=lambda x: len(x))
-    largestClique = fbSubGraph.subgraph(set(cliques[-1])).copy()
-    secondLargestClique = fbSubGraph.subgraph(set(cliques[-2])).copy()
-    largestCliqueBetweenessCentrality = nx.betweenness_centrality(largestClique)
-    secondLargestCliqueBetweenessCentrality = nx.betweenness_centrality(secondLargestClique)
-    largestCliqueBottleneckUser = max(largestCliqueBetweenessCentrality, key=largestCliqueBetweenessCentrality.get)
-    secondLargestCliqueBottleneckUser = max(secondLargestCliqueBetweenessCentrality, key=secondLargestCliqueBetweenessCentrality.get)
+    cliques = sn.findLargestCliques(2)
+    expectedCliqueSizes = sorted((len(clique) for clique in nx.find_cliques(fbSubGraph)), reverse=True)[:2]
+    self.assertEqual(expectedCliqueSizes, [len(clique) for clique in cliques])
+    betweenness = approximateBetweenness(sn.csrGraph)
+    userBetweenness = dict(zip(sn.csrGraph.nodes, betweenness.tolist()))
+    largestCliqueBottleneckUser = max(cliques[0], key=userBetweenness.get)
+    secondLargestCliqueBottleneckUser = max(cliques[1], key=userBetweenness.get)
     expectedDistanceBetweenTwoUsers = sn.getDistanceWithCurrentNode(largestCliqueBottleneckUser, secondLargestCliqueBottleneckUser)
 
     self.assertEqual(expectedDistanceBetweenTwoUsers, sn.connectCommunities())
 
+  def test_FindLargestCliquesMatchesAllMaximalCliques(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(2000, 6, 0.6, seed=2), nx.gnp_random_graph(80, 0.4, seed=3)]:
+      sn = SocialNetwork(fbGraph)
+      maximalCliques = {frozenset(clique) for clique in nx.find_cliques(fbGraph)}
+      expectedCliqueSizes = sorted((len(clique) for clique in maximalCliques), reverse=True)
+      for k in [1, 2, 10]:
+        cliques = findTopKCliques(sn.csrGraph, k).cliques
+        self.assertEqual(expectedCliqueSizes[:k], [len(clique) for clique in cliques])
+        self.assertTrue(all(frozenset(sn.csrGraph.nodes[node] for node in clique) in maximalCliques for clique in cliques))
+
+  def test_FindLargestCliquesWithTimeBudget(self):
+    sn = SocialNetwork(nx.powerlaw_cluster_graph(5000, 10, 0.8, seed=2))
+    topCliques = findTopKCliques(sn.csrGraph, 2, timeBudget=0)
+    self.assertFalse(topCliques.complete)
+    self.assertLessEqual(len(topCliques.cliques), 2)
+    largestCliques = sn.findLargestCliques(2)
+    cachedCliques = sn._largestCliques
+    sn.findLargestCommunities()
+    sn.findLargestCliques(1)
+    self.assertIs(cachedCliques, sn._largestCliques)
+    self.assertEqual(largestCliques[0], sn.findLargestCliques(1)[0])
+
+  def test_BetweennessCentrality(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(300, 3, 0.3, seed=1), nx.gnp_random_graph(200, 0.02, seed=3, directed=True)]:
+      sn = SocialNetwork(fbGraph)
+      expectedBetweenness = nx.betweenness_centrality(fbGraph)
+      exactBetweenness = sn.betweennessCentrality(pivots=len(fbGraph))
+      parallelBetweenness = sn.betweennessCentrality(pivots=len(fbGraph), seed=1, workers=3)
+      for node in fbGraph.nodes():
+        self.assertAlmostEqual(expectedBetweenness[node], exactBetweenness[node])
+        self.assertAlmostEqual(expectedBetweenness[node], parallelBetweenness[node])
+      sampledBetweenness = sn.betweennessCentrality(epsilon=0.1, delta=0.1)
+      self.assertLess(max(abs(expectedBetweenness[node] - sampledBetweenness[node]) for node in fbGraph.nodes()), 0.1)
+
   def test_ConnectCommunitiesWithEmptyGraph(self):
     fbGraph = nx.Graph()
     sn = SocialNetwork(fbGraph)
@@ -142,7 +205,11 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
     nodes = [node for node in list(fbGraph.nodes())[:1000]]
     fbSubGraph = fbGraph.subgraph(nodes)
     sn = SocialNetwork(fbSubGraph)
-    largestClique = set(sorted(nx.find_cliques(fbSubGraph), key=lambda x: len(x))[-1])
+    maximalCliques = {frozenset(clique) for clique in nx.find_cliques(fbSubGraph)}
+    largestClique = set(sn.findLargestCliques(1)[0])
+    # Any maximum clique can be picked when several share the largest size
+    self.assertIn(frozenset(largestClique), maximalCliques)
+    self.assertEqual(max(len(clique) for clique in maximalCliques), len(largestClique))
     expectedFacebookLargestClique = fbSubGraph.subgraph(largestClique).copy()
     # Go out 1 degree of separation
     for node in list(expectedFacebookLargestClique.nodes()):
@@ -168,6 +235,63 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
       for neighbour  in fbSubGraph.neighbors(node):
         self.assertEqual(fbSubGraph.has_edge(node, neighbour), sn.pathExistBFS(node, neighbour))
 
+  def test_PathExistBFSAndDFSBeyondDirectNeighbors(self):
+    fbGraph = nx.Graph([(1, 2), (2, 3), (3, 4), (5, 6)])
+    sn = SocialNetwork(fbGraph)
+    for startVertex in fbGraph.nodes():
+      for endVertex in fbGraph.nodes():
+        expectedPathExist = nx.has_path(fbGraph, startVertex, endVertex)
+        self.assertEqual(expectedPathExist, sn.pathExistBFS(startVertex, endVertex))
+        self.assertEqual(expectedPathExist, sn.pathExistDFS(startVertex, endVertex))
+    self.assertEqual(3, sn.getDistanceWithCurrentNode(1, 4))
+    self.assertEqual(-1, sn.getDistanceWithCurrentNode(1, 6))
+
+  def test_ShortestDistanceMatchesNetworkx(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(400, 2, 0.2, seed=4), nx.gnp_random_graph(150, 0.02, seed=8, directed=True)]:
+      sn = SocialNetwork(fbGraph)
+      expectedDistances = dict(nx.all_pairs_shortest_path_length(fbGraph))
+      for startVertex in list(fbGraph.nodes())[::7]:
+        for endVertex in fbGraph.nodes():
+          expectedDistance = expectedDistances[startVertex].get(endVertex, -1)
+          self.assertEqual(expectedDistance, sn.getDistanceWithCurrentNode(startVertex, endVertex))
+          path = sn.getShortestPath(startVertex, endVertex)
+          self.assertEqual(expectedDistance, len(path) - 1)
+          if path:
+            self.assertEqual((startVertex, endVertex), (path[0], path[-1]))
+            self.assertTrue(all(fbGraph.has_edge(u, v) for u, v in zip(path, path[1:])))
+
+  def test_TraverseBFSAndDFSOrder(self):
+    for fbGraph in [nx.powerlaw_cluster_graph(300, 2, 0.2, seed=6), nx.gnp_random_graph(150, 0.02, seed=8, directed=True)]:
+      sn = SocialNetwork(fbGraph)
+      for startVertex in list(fbGraph.nodes())[::25]:
+        expectedBFS = [(startVertex, 0, None)]
+        depths = nx.single_source_shortest_path_length(fbGraph, startVertex)
+        expectedBFS += [(v, depths[v], u) for u, v in nx.bfs_edges(fbGraph, startVertex)]
+        self.assertEqual(expectedBFS, list(sn.traverseBFS(startVertex)))
+        expectedDFS = list(nx.dfs_preorder_nodes(fbGraph, startVertex))
+        dfsVisit = list(sn.traverseDFS(startVertex))
+        self.assertEqual(expectedDFS, [node for node, _, _ in dfsVisit])
+        depthOf = {node: depth for node, depth, _ in dfsVisit}
+        for node, depth, parent in dfsVisit[1:]:
+          self.assertTrue(fbGraph.has_edge(parent, node))
+          self.assertEqual(depthOf[parent] + 1, depth)
+
+  def test_FindPathDFSTakesVisitedUserIds(self):
+    sn = SocialNetwork(nx.path_graph(['a', 'b', 'c', 'd', 'e']))
+    visitedNodes = {'c'}
+    self.assertFalse(sn.findPathBetweenTwoNodesDFS('a', 'e', visitedNodes))
+    self.assertEqual({'a', 'b', 'c'}, visitedNodes)
+    visitedNodes = {'a', 'x'}
+    self.assertTrue(sn.findPathBetweenTwoNodesDFS('a', 'e', visitedNodes))
+    self.assertEqual({'a', 'b', 'c', 'd', 'e', 'x'}, visitedNodes)
+
+  def test_PathExistDFSOnDeepGraphWithoutRecursion(self):
+    fbGraph = nx.path_graph(50000)
+    sn = SocialNetwork(fbGraph)
+    self.assertTrue(sn.pathExistDFS(0, 49999))
+    self.assertTrue(sn.pathExistBFS(0, 49999))
+    self.assertEqual(49999, max(depth for _, depth, _ in sn.traverseDFS(0)))
+
   def test_TraversePathWillAllNodes(self):
     dataset = downloadDataset()
     with open(dataset[1], 'rb') as f:
@@ -181,6 +305,19 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
           self.assertTrue((node, neighbour) in sn.traversePath)
     self.assertGreater(len(sn.traversePath), 0)
 
+  def test_TraversePathMatchesConnectedComponents(self):
+    fbGraph = nx.gnp_random_graph(120, 0.015, seed=11)
+    sn = SocialNetwork(fbGraph)
+    component = {node: i for i, nodes in enumerate(nx.connected_components(fbGraph)) for node in nodes}
+    for startVertex in fbGraph.nodes():
+      for endVertex in fbGraph.nodes():
+        expectedPathExist = component[startVertex] == component[endVertex]
+        self.assertEqual(expectedPathExist, sn.pathExist(startVertex, endVertex))
+        self.assertEqual(expectedPathExist, (startVertex, endVertex) in sn.traversePath)
+    expectedConnectedPairs = sum(len(nodes) * (len(nodes) - 1) for nodes in nx.connected_components(fbGraph))
+    self.assertEqual(expectedConnectedPairs, len(sn.traversePath))
+    self.assertEqual(nx.number_connected_components(fbGraph), sn.traversePath.numberOfComponents())
+
   def test_ShortestPathWithEmptyGraph(self):
     fbGraph = nx.Graph()
     sn = SocialNetwork(fbGraph)
@@ -190,6 +327,85 @@ class TestSocialNetworkAnalysis(unittest.TestCase):
           self.assertTrue((node, neighbour) in sn.traversePath)
     self.assertEqual(0, 0)
 
+  def test_DirectedInfluenceOnTwitter(self):
+    dataset = downloadDataset()
+    with open(dataset[0], 'rb') as f:
+      twitterGraph = pickle.load(f)
+    sn = SocialNetwork(twitterGraph, instrument=True)
+    expectedPageRank = nx.pagerank(twitterGraph)
+    pageRank = sn.pageRank()
+    for node in twitterGraph:
+      self.assertAlmostEqual(expectedPageRank[node], pageRank[node], places=9)
+
+    influencers = sn.findInfluencers(5, category='D', occupation=['scientist', 'celebrity'])
+    expected = sorted((node for node, data in twitterGraph.nodes(data=True) if data.get('category') == 'D' and data.get('occupation') in ('scientist', 'celebrity')),
+                      key=lambda node: -expectedPageRank[node])[:5]
+    self.assertEqual(5, len(influencers))
+    for expectedNode, (node, score) in zip(expected, influencers):
+      self.assertAlmostEqual(expectedPageRank[expectedNode], score, places=9)
+    for node, _ in influencers:
+      self.assertEqual('D', twitterGraph.nodes[node]['category'])
+    self.assertEqual([], sn.findInfluencers(5, category='unknown'))
+
+    user = influencers[0][0]
+    self.assertCountEqual(list(twitterGraph.predecessors(user)), sn.followers(user))
+    self.assertEqual(list(twitterGraph.successors(user)), sn.following(user))
+
+    # After a new follow the next run starts from the previous scores
+    coldIterations = sn.instrumentation.counters['pageRank.iterations']
+    sn.addEdge(user, 'newcomer')
+    pageRank = sn.pageRank(tolerance=1e-10)
+    warmIterations = sn.instrumentation.counters['pageRank.iterations'] - coldIterations
+    expectedPageRank = nx.pagerank(sn.fbGraph, tol=1e-10)
+    self.assertAlmostEqual(expectedPageRank['newcomer'], pageRank['newcomer'], places=9)
+    coldStart = SocialNetwork(sn.fbGraph, instrument=True)
+    coldStart.pageRank(tolerance=1e-10)
+    self.assertLessEqual(warmIterations, coldStart.instrumentation.counters['pageRank.iterations'])
+
+  def test_HitsMatchesNetworkx(self):
+    graph = nx.gnp_random_graph(300, 0.03, seed=6, directed=True)
+    sn = SocialNetwork(graph)
+    hubs, authorities = sn.hits()
+    expectedHubs, expectedAuthorities = nx.hits(graph)
+    for node in graph:
+      self.assertAlmostEqual(expectedHubs[node], hubs[node], places=8)
+      self.assertAlmostEqual(expectedAuthorities[node], authorities[node], places=8)
+    topAuthority = max(graph, key=lambda node: (expectedAuthorities[node], -node))
+    self.assertEqual(topAuthority, sn.findInfluencers(1, method='hits')[0][0])
+
+  def test_LabelPropagationCommunities(self):
+    graph = nx.planted_partition_graph(4, 40, 0.4, 0.005, seed=7)
+    sn = SocialNetwork(graph)
+    communities = sn.detectCommunities(seed=3)
+    self.assertTrue(communities.converged)
+    self.assertEqual(graph.number_of_nodes(), int(communities.sizes.sum()))
+    self.assertEqual(sorted(communities.sizes.tolist(), reverse=True), communities.sizes.tolist())
+    # Every planted block is found
+    memberships = sn.communityMemberships(seed=3)
+    blocks = [set(range(block * 40, (block + 1) * 40)) for block in range(4)]
+    self.assertEqual(sorted(map(sorted, blocks)), sorted(sorted(node for node in graph if memberships[node] == community) for community in range(4)))
+    # The same seed gives the same communities
+    self.assertEqual(communities.membership.tolist(), SocialNetwork(graph).detectCommunities(seed=3).membership.tolist())
+
+    largestCommunity = sn.findLargestCommunities(method='labelPropagation', seed=3)
+    self.assertEqual({node for node in graph if memberships[node] == 0}, set(largestCommunity))
+    self.assertEqual(2, len(sn.largestCommunities(2, 'labelPropagation', seed=3)))
+    self.assertIn(sn.connectCommunities(pivots=50, method='labelPropagation', seed=3), [1, 2, 3])
+    self.assertRaises(ValueError, sn.largestCommunities, 2, 'louvain')
+
+  def test_LabelPropagationOnDirectedAndEmptyGraphs(self):
+    dataset = downloadDataset()
+    with open(dataset[0], 'rb') as f:
+      twitterGraph = pickle.load(f)
+    sn = SocialNetwork(twitterGraph)
+    communities = sn.detectCommunities()
+    self.assertEqual(twitterGraph.number_of_nodes(), int(communities.sizes.sum()))
+    # Communities never span weakly connected components
+    components = sn.traversePath.componentLabels()
+    for community in range(10):
+      self.assertEqual(1, len(set(components[communities.members(community)].tolist())))
+    self.assertEqual(0, SocialNetwork(nx.Graph()).detectCommunities().numberOfCommunities())
+
 def runTests(testCase: TestSocialNetworkAnalysis, testMethod: str):
     suite = unittest.TestSuite()
     suite.addTest(testCase(testMethod))
@@ -197,14 +413,6 @@ def runTests(testCase: TestSocialNetworkAnalysis, testMethod: str):
     runner.run(suite)
 
 if __name__ == '__main__':
-    stressTests = [
-        'test_StressTestingFrom1000To20000NodesForRecommendedFriendsWithUnsortedData'
-        'test_StressTestingFrom1000To20000NodesForRecommendedFriendsWithSortedDegreeData',
-        'test_StressTestingFrom1000To20000NodesForConnectingComunities',
-        'test_StressTestingFrom1000To20000NodesForFindingImportantPeople',
-        'test_StressTestingFrom1000To20000NodesForFindingLargestCommunities'
-    ]
-
     unitTests = [
         'test_FindRecommendedFriends',
         'test_ShortestPathWithEmptyGraph',
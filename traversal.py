@@ -0,0 +1,127 @@
+from collections import deque
+from typing import Iterator
+from csr_graph import CSRGraph
+
+# breadthFirstTraversal lazily yields (node, depth, parent) for every node reachable from source,
+# in BFS order, as soon as it is discovered. The parent of source is None.
+# With a counters dict, the vertices expanded and pushed on the queue are added to it
+# when the traversal finishes or is closed early
+# Time complexity: O(V + E) if fully consumed
+# Space complexity: O(visited nodes)
+def breadthFirstTraversal(csrGraph: CSRGraph, source: int, counters: dict = None) -> Iterator[tuple[int, int, int]]:
+  visitedNodes = {source}
+  queue = deque([(source, 0)])
+  try:
+    yield source, 0, None
+    while queue:
+      node, depth = queue.popleft()
+      for neighbor in csrGraph.neighbors(node):
+        if neighbor not in visitedNodes:
+          visitedNodes.add(neighbor)
+          queue.append((neighbor, depth + 1))
+          yield neighbor, depth + 1, node
+  finally:
+    if counters is not None:
+      # Every visited node was queued once, the ones still queued were never expanded
+      counters['bfs.verticesExpanded'] += len(visitedNodes) - len(queue)
+      counters['bfs.frontierPushes'] += len(visitedNodes) - 1
+
+# depthFirstTraversal lazily yields (node, depth, parent) in the same preorder as the recursive DFS,
+# with an explicit stack of (node, depth, next neighbour position) instead of the call stack,
+# so deep graphs can not hit the recursion limit. Nodes already in visitedNodes are skipped.
+# With a counters dict, the vertices visited are added to it when the traversal ends
+# Time complexity: O(V + E) if fully consumed
+# Space complexity: O(visited nodes)
+def depthFirstTraversal(csrGraph: CSRGraph, source: int, visitedNodes: set = None, counters: dict = None) -> Iterator[tuple[int, int, int]]:
+  visitedNodes = set() if visitedNodes is None else visitedNodes
+  if source in visitedNodes:
+    return
+  offsets, indices = csrGraph.offsets, csrGraph.indices
+  alreadyVisited = len(visitedNodes)
+  visitedNodes.add(source)
+  try:
+    yield source, 0, None
+    stack = [(source, 0, int(offsets[source]))]
+    while stack:
+      node, depth, position = stack[-1]
+      end = offsets[node + 1]
+      while position < end and int(indices[position]) in visitedNodes:
+        position += 1
+      if position == end:
+        stack.pop()
+        continue
+      neighbor = int(indices[position])
+      stack[-1] = (node, depth, position + 1)
+      visitedNodes.add(neighbor)
+      yield neighbor, depth + 1, node
+      stack.append((neighbor, depth + 1, int(offsets[neighbor])))
+  finally:
+    if counters is not None:
+      counters['dfs.verticesVisited'] += len(visitedNodes) - alreadyVisited
+
+# bidirectionalSearch finds the shortest path between two nodes of an unweighted graph
+# by growing a BFS from both ends, always expanding the smaller frontier one full level,
+# and stopping as soon as the two searches meet. Only the visited nodes get an entry,
+# nothing is allocated per node up front.
+# Returns the distance (-1 when unreachable) and, if asked for, the path as contiguous ids.
+# With a counters dict, the vertices expanded and pushed on the frontiers are added to it
+# Time complexity: O(V + E) in the worst case, about O(b^(d/2)) for branching factor b and distance d
+# Space complexity: O(visited nodes)
+def bidirectionalSearch(csrGraph: CSRGraph, source: int, target: int, returnPath: bool = False, counters: dict = None) -> tuple[int, list]:
+  if source == target:
+    return 0, [source] if returnPath else None
+
+  successors, predecessors = csrGraph, csrGraph.reverse()
+  # node -> parent on the way back to source / on the way forward to target
+  forwardParents, backwardParents = {source: None}, {target: None}
+  forwardFrontier, backwardFrontier = [source], [target]
+  forwardDepth = backwardDepth = 0
+
+  while forwardFrontier and backwardFrontier:
+    expandForward = len(forwardFrontier) <= len(backwardFrontier)
+    if expandForward:
+      graph, frontier, parents, otherParents = successors, forwardFrontier, forwardParents, backwardParents
+    else:
+      graph, frontier, parents, otherParents = predecessors, backwardFrontier, backwardParents, forwardParents
+
+    nextFrontier = []
+    if counters is not None:
+      counters['shortestPath.verticesExpanded'] += len(frontier)
+    for node in frontier:
+      for neighbor in graph.neighbors(node):
+        if neighbor in parents:
+          continue
+        parents[neighbor] = node
+        if neighbor in otherParents:
+          # The first meeting point lies on a shortest path, and the other search
+          # reached it on its current level
+          distance = forwardDepth + backwardDepth + 1
+          if counters is not None:
+            counters['shortestPath.frontierPushes'] += len(forwardParents) + len(backwardParents) - 2
+          if not returnPath:
+            return distance, None
+          return distance, joinPath(neighbor, forwardParents, backwardParents)
+        nextFrontier.append(neighbor)
+
+    if expandForward:
+      forwardFrontier, forwardDepth = nextFrontier, forwardDepth + 1
+    else:
+      backwardFrontier, backwardDepth = nextFrontier, backwardDepth + 1
+
+  if counters is not None:
+    counters['shortestPath.frontierPushes'] += len(forwardParents) + len(backwardParents) - 2
+  return -1, None
+
+# joinPath follows the parents from the meeting node back to source and forward to target
+def joinPath(meetingNode: int, forwardParents: dict, backwardParents: dict) -> list[int]:
+  path = []
+  node = meetingNode
+  while node is not None:
+    path.append(node)
+    node = forwardParents[node]
+  path.reverse()
+  node = backwardParents[meetingNode]
+  while node is not None:
+    path.append(node)
+    node = backwardParents[node]
+  return path